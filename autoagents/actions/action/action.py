@@ -11,12 +11,24 @@ import json
 
 from tenacity import retry, stop_after_attempt, wait_fixed
 
+import cfg
 from .action_output import ActionOutput
-from autoagents.system.llm import LLM
-from autoagents.system.utils.common import OutputParser
+from autoagents.system.llm import LLM, get_llm
+from autoagents.system.provider.stream import emit_delta, stream_tags
+from autoagents.system.utils.common import OutputParser, StreamingSectionParser, split_prompt_template
 from autoagents.system.logs import logger
 
+
+def _structured_output_unsupported(e: Exception) -> bool:
+    """Whether a provider error says the model does not accept a response_format/json_schema"""
+    message = str(e).lower()
+    return getattr(e, "status_code", None) == 400 and ("response_format" in message or "json_schema" in message)
+
+
 class Action(ABC):
+    # Whether this action may request provider-enforced JSON instead of '## <section>' markdown
+    structured_output = True
+
     def __init__(self, name: str = '', context=None, llm: LLM = None, serpapi_api_key=None):
         self.name: str = name
         # if llm is None:
@@ -34,7 +46,7 @@ class Action(ABC):
         """Set prefix for later usage"""
         self.prefix = prefix
         self.profile = profile
-        self.llm = LLM(proxy, api_key)
+        self.llm = get_llm(proxy, api_key)
         self.serpapi_api_key = serpapi_api_key
 
     def __str__(self):
@@ -43,24 +55,55 @@ class Action(ABC):
     def __repr__(self):
         return self.__str__()
 
+    def _with_prefix(self, system_msgs: Optional[list[str]] = None) -> list[str]:
+        """Add the role prefix to the system messages.
+
+        In prompt-cache mode the prefix goes first so that repeated calls of the
+        same role share the longest possible static prefix.
+        """
+        system_msgs = list(system_msgs or [])
+        if cfg.LLM_PROMPT_CACHE:
+            return [self.prefix] + system_msgs
+        system_msgs.append(self.prefix)
+        return system_msgs
+
+    def _compose_prompt(self, template: str, dynamic_fields, **kwargs) -> tuple[str, Optional[list[str]]]:
+        """Format `template`, returning the user prompt and extra system messages.
+
+        In prompt-cache mode the static sections of the template become a system
+        message and only the sections using `dynamic_fields` stay in the prompt.
+        Each action module lists the template fields that change between calls in
+        its `DYNAMIC_FIELDS`; every other section is a prefix the provider can cache.
+        """
+        if not cfg.LLM_PROMPT_CACHE:
+            return template.format(**kwargs), None
+        static, dynamic = split_prompt_template(template, dynamic_fields, **kwargs)
+        return dynamic, [static]
+
     async def _aask(self, prompt: str, system_msgs: Optional[list[str]] = None) -> str:
         """Append default prefix"""
-        if not system_msgs:
-            system_msgs = []
-        system_msgs.append(self.prefix)
-        return await self.llm.aask(prompt, system_msgs)
+        system_msgs = self._with_prefix(system_msgs)
+        with stream_tags(action=str(self)):
+            return await self.llm.aask(prompt, system_msgs)
 
     @retry(stop=stop_after_attempt(2), wait=wait_fixed(1))
     async def _aask_v1(self, prompt: str, output_class_name: str,
                        output_data_mapping: dict,
                        system_msgs: Optional[list[str]] = None) -> ActionOutput:
         """Append default prefix"""
-        if not system_msgs:
-            system_msgs = []
-        system_msgs.append(self.prefix)
-        content = await self.llm.aask(prompt, system_msgs)
-        logger.debug(content)
+        system_msgs = self._with_prefix(system_msgs)
         output_class = ActionOutput.create_model_class(output_class_name, output_data_mapping)
+        if cfg.LLM_STRUCTURED_OUTPUT and self.structured_output and self.llm.structured_output:
+            output = await self._aask_structured(prompt, output_class, output_data_mapping, system_msgs)
+            if output is not None:
+                return output
+
+        with stream_tags(action=str(self)):
+            if cfg.LLM_STREAM_EARLY_STOP:
+                content = await self._aask_sections(prompt, output_data_mapping, system_msgs)
+            else:
+                content = await self.llm.aask(prompt, system_msgs)
+        logger.debug(content)
         try:
             parsed_data = OutputParser.parse_data_with_mapping(content, output_data_mapping)
             logger.debug(parsed_data)
@@ -74,6 +117,49 @@ class Action(ABC):
             # Return original content for transparency, with repaired instruct_content
             return ActionOutput(content, instruct_content)
 
+    async def _aask_structured(self, prompt: str, output_class, mapping: dict,
+                               system_msgs: list[str]) -> Optional[ActionOutput]:
+        """Ask for provider-enforced JSON; return None to fall back to the markdown parser"""
+        schema = ActionOutput.create_json_schema(mapping)
+        instructions = (
+            "Return ONLY a JSON object instead of markdown sections. "
+            f"Use exactly these keys, one per output section: {json.dumps(list(mapping))}."
+        )
+        try:
+            with stream_tags(action=str(self)):
+                data = await self.llm.aask_json(prompt, system_msgs + [instructions], schema, output_class.__name__)
+            instruct_content = output_class(**data)
+        except Exception as e:
+            if getattr(e, "status_code", None) is not None and not _structured_output_unsupported(e):
+                # Context-length errors, or rate limits left after the provider retries, are not about the format
+                raise
+            # Only this call falls back; the shared client keeps trying structured output
+            logger.warning(f"Structured output failed, falling back to the markdown parser: {e}")
+            return None
+        content = ActionOutput.render_markdown(data)
+        # Structured replies are not streamed; show the result in one piece
+        emit_delta(content)
+        return ActionOutput(content, instruct_content)
+
+    async def _aask_sections(self, prompt: str, mapping: dict, system_msgs: list[str]) -> str:
+        """Stream the reply and stop as soon as every section of `mapping` has been received"""
+        parser = StreamingSectionParser(mapping)
+        stream = self.llm.aask_stream(prompt, system_msgs)
+        try:
+            async for delta in stream:
+                emit_delta(delta)
+                parser.feed(delta)
+                if parser.complete:
+                    logger.debug(f"{self}: all sections received, closing the stream early")
+                    break
+        finally:
+            # Closing the generator closes the provider stream, so no further tokens are billed
+            await stream.aclose()
+        parser.close()
+        if parser.errors:
+            logger.debug(f"{self}: section validation issues {parser.errors}")
+        return parser.text
+
     async def _repair_with_llm(self, raw_text: str, mapping: dict, system_msgs: list[str]) -> Dict[str, Any]:
         """Use LLM to coerce output into the exact schema defined by mapping.
 
@@ -117,7 +203,6 @@ class Action(ABC):
         # Reuse existing system messages context + the strict formatter role
         strict_system_msgs = list(system_msgs) + [repair_instructions]
 
-        import cfg  # local import to avoid cycles at module load
         attempts = int(getattr(cfg, "LLM_PARSER_REPAIR_ATTEMPTS", 1) or 1)
         last_err = None
         for _ in range(max(1, attempts)):
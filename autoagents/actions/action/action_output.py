@@ -7,11 +7,50 @@
 @From    : https://github.com/geekan/MetaGPT/blob/main/metagpt/actions/action_output.py
 """
 
-from typing import Dict, Type
+from functools import lru_cache
+from typing import Dict, Type, get_args, get_origin
 
 from pydantic import BaseModel, create_model, root_validator, validator
 
 
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean"}
+
+
+def _json_schema_of(typing) -> dict:
+    origin = get_origin(typing)
+    if origin in (list, tuple):
+        args = [a for a in get_args(typing) if a is not Ellipsis]
+        return {"type": "array", "items": _json_schema_of(args[0]) if args else {"type": "string"}}
+    return {"type": _JSON_TYPES.get(typing, "string")}
+
+
+def _build_model_class(class_name: str, mapping: Dict[str, Type]):
+    new_class = create_model(class_name, **mapping)
+
+    @validator('*', allow_reuse=True)
+    def check_name(v, field):
+        if field.name not in mapping.keys():
+            raise ValueError(f'Unrecognized block: {field.name}')
+        return v
+
+    @root_validator(pre=True, allow_reuse=True)
+    def check_missing_fields(values):
+        required_fields = set(mapping.keys())
+        missing_fields = required_fields - set(values.keys())
+        if missing_fields:
+            raise ValueError(f'Missing fields: {missing_fields}')
+        return values
+
+    new_class.__validator_check_name = classmethod(check_name)
+    new_class.__root_validator_check_missing_fields = classmethod(check_missing_fields)
+    return new_class
+
+
+@lru_cache(maxsize=256)
+def _cached_model_class(class_name: str, items: tuple):
+    return _build_model_class(class_name, dict(items))
+
+
 class ActionOutput:
     content: str
     instruct_content: BaseModel
@@ -22,22 +61,37 @@ class ActionOutput:
 
     @classmethod
     def create_model_class(cls, class_name: str, mapping: Dict[str, Type]):
-        new_class = create_model(class_name, **mapping)
-
-        @validator('*', allow_reuse=True)
-        def check_name(v, field):
-            if field.name not in mapping.keys():
-                raise ValueError(f'Unrecognized block: {field.name}')
-            return v
-
-        @root_validator(pre=True, allow_reuse=True)
-        def check_missing_fields(values):
-            required_fields = set(mapping.keys())
-            missing_fields = required_fields - set(values.keys())
-            if missing_fields:
-                raise ValueError(f'Missing fields: {missing_fields}')
-            return values
-
-        new_class.__validator_check_name = classmethod(check_name)
-        new_class.__root_validator_check_missing_fields = classmethod(check_missing_fields)
-        return new_class
+        """Return the pydantic model for `mapping`, reusing the class built for an identical mapping"""
+        key = (class_name, tuple(mapping.items()))
+        try:
+            hash(key)
+        except TypeError:
+            # Field definitions with unhashable defaults cannot be cached
+            return _build_model_class(class_name, mapping)
+        return _cached_model_class(*key)
+
+    @classmethod
+    def create_json_schema(cls, mapping: Dict[str, Type]) -> dict:
+        """Translate an output mapping into a strict JSON schema with one property per section"""
+        properties = {}
+        for key, typing_define in mapping.items():
+            typing = typing_define[0] if isinstance(typing_define, tuple) else typing_define
+            properties[key] = _json_schema_of(typing)
+        return {"type": "object", "properties": properties, "required": list(mapping), "additionalProperties": False}
+
+    @staticmethod
+    def render_markdown(data: dict) -> str:
+        """Render parsed sections back into the '## <section>' format the markdown parser reads"""
+        return "\n\n".join(f"## {key}\n{value}" for key, value in data.items())
+
+
+if __name__ == '__main__':
+    import timeit
+
+    from autoagents.actions.custom_action import OUTPUT_MAPPING
+
+    n = 2000
+    uncached = timeit.timeit(lambda: _build_model_class("task", OUTPUT_MAPPING), number=n) / n
+    cached = timeit.timeit(lambda: ActionOutput.create_model_class("task", OUTPUT_MAPPING), number=n) / n
+    print(f"create_model_class: uncached {uncached * 1e6:.1f}us | cached {cached * 1e6:.1f}us per call "
+          f"({_cached_model_class.cache_info()})")
@@ -29,6 +29,7 @@ Check the Execution Plan as follows:
    - Each step assigns at least one expert role; if multiple, clarify contributions and integration.
    - Step descriptions are sufficiently detailed and show how steps connect.
    - Each step defines expected output and the input required for the next step; ensure consistency.
+   - Each step's `(depends on: ...)` annotation lists exactly the earlier steps whose output it uses.
    - The final step is the language expert producing the synthesized answer.
 3. Provide a concise summary of issues and improvements. If none, write 'No Suggestions'.
 
@@ -59,6 +60,8 @@ OUTPUT_MAPPING = {
     "Suggestions": (str, ...),
 }
 
+DYNAMIC_FIELDS = ("context", "plan", "roles", "history")
+
 # TOOLS = 'tool: SearchAndSummarize, description: useful for when you need to answer unknown questions'
 TOOLS = 'None'
 
@@ -75,6 +78,6 @@ class CheckPlans(Action):
         roles += re.findall('## Created Roles List:([\s\S]*?)##', str(context))[-1]
         plan = re.findall('## Execution Plan:([\s\S]*?)##', str(context))[-1]
         context = re.findall('## Question or Task:([\s\S]*?)##', str(context))[-1]
-        prompt = PROMPT_TEMPLATE.format(context=context, plan=plan, roles=roles, format_example=FORMAT_EXAMPLE, history=history, tools=TOOLS)
-        rsp = await self._aask_v1(prompt, "task", OUTPUT_MAPPING)
+        prompt, system_msgs = self._compose_prompt(PROMPT_TEMPLATE, DYNAMIC_FIELDS, context=context, plan=plan, roles=roles, format_example=FORMAT_EXAMPLE, history=history, tools=TOOLS)
+        rsp = await self._aask_v1(prompt, "task", OUTPUT_MAPPING, system_msgs)
         return rsp
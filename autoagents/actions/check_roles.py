@@ -77,6 +77,8 @@ OUTPUT_MAPPING = {
     "Suggestions": (str, ...),
 }
 
+DYNAMIC_FIELDS = ("question", "history", "created_roles", "selected_roles")
+
 # TOOLS = '['
 # for item in TOOLS_LIST:
 #     TOOLS += '(Tool:' + item['toolname'] + '. Description:' + item['description'] + '),'
@@ -96,7 +98,7 @@ class CheckRoles(Action):
         created_roles = re.findall('## Created Roles List:([\s\S]*?)##', str(context))[0]
         selected_roles = re.findall('## Selected Roles List:([\s\S]*?)##', str(context))[0]
         
-        prompt = PROMPT_TEMPLATE.format(question=question, history=history, existing_roles=ROLES_LIST, created_roles=created_roles, selected_roles=selected_roles, format_example=FORMAT_EXAMPLE, tools=TOOLS)
-        rsp = await self._aask_v1(prompt, "task", OUTPUT_MAPPING)
+        prompt, system_msgs = self._compose_prompt(PROMPT_TEMPLATE, DYNAMIC_FIELDS, question=question, history=history, existing_roles=ROLES_LIST, created_roles=created_roles, selected_roles=selected_roles, format_example=FORMAT_EXAMPLE, tools=TOOLS)
+        rsp = await self._aask_v1(prompt, "task", OUTPUT_MAPPING, system_msgs)
 
         return rsp
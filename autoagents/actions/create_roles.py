@@ -31,7 +31,7 @@ Produce roles and a plan via:
    - Ensure clear scope, meaningful name, precise goal, and practical constraints.
    - Always add one language expert role (no tools) to summarize final results.
    - Output each new role as a single JSON blob with keys: name, description, tools, suggestions, prompt.
-4. Provide a concise execution plan: a numbered sequence of steps that logically reaches the goal, listing the involved roles, expected output per step, and required input for the next step. End with the language expert synthesis step.
+4. Provide a concise execution plan: a numbered sequence of steps that logically reaches the goal, listing the involved roles, expected output per step, and required input for the next step. End each step's line with the numbers of the earlier steps whose output it needs, e.g. `(depends on: 1, 3)`, or `(depends on: none)` if it can start right away; steps that do not depend on each other run in parallel. End with the language expert synthesis step.
 
 Here is an example JSON blob for a role:
 {{{{
@@ -82,9 +82,9 @@ JSON BLOB 3
 ```
 
 ## Execution Plan:
-1. [ROLE 1, ROLE2, ...]: STEP 1
-2. [ROLE 1, ROLE2, ...]: STEP 2
-2. [ROLE 1, ROLE2, ...]: STEP 3
+1. [ROLE 1, ROLE2, ...]: STEP 1 (depends on: none)
+2. [ROLE 1, ROLE2, ...]: STEP 2 (depends on: none)
+3. [ROLE 1, ROLE2, ...]: STEP 3 (depends on: 1, 2)
 
 ## RoleFeedback
 feedback on the historical Role suggestions
@@ -102,6 +102,8 @@ OUTPUT_MAPPING = {
     "PlanFeedback": (str, ...),
 }
 
+DYNAMIC_FIELDS = ("context", "history", "suggestions")
+
 # TOOLS = '['
 # for item in TOOLS_LIST:
 #     TOOLS += '(Tool:' + item['toolname'] + '. Description:' + item['description'] + '),'
@@ -110,6 +112,8 @@ TOOLS = 'tool: SearchAndSummarize, description: useful for when you need to answ
 
 
 class CreateRoles(Action):
+    # Downstream roles parse the raw '## <section>:' reply, so keep the markdown format
+    structured_output = False
 
     def __init__(self, name="CreateRolesTasks", context=None, llm=None):
         super().__init__(name, context, llm)
@@ -125,9 +129,9 @@ class CreateRoles(Action):
         # info = f"## Search Results\n{sas.result}\n\n## Search Summary\n{rsp}"
 
         from autoagents.roles import ROLES_LIST
-        prompt = PROMPT_TEMPLATE.format(context=context, format_example=FORMAT_EXAMPLE, existing_roles=ROLES_LIST, tools=TOOLS, history=history, suggestions=suggestions)
+        prompt, system_msgs = self._compose_prompt(PROMPT_TEMPLATE, DYNAMIC_FIELDS, context=context, format_example=FORMAT_EXAMPLE, existing_roles=ROLES_LIST, tools=TOOLS, history=history, suggestions=suggestions)
         
-        rsp = await self._aask_v1(prompt, "task", OUTPUT_MAPPING)
+        rsp = await self._aask_v1(prompt, "task", OUTPUT_MAPPING, system_msgs)
         return rsp
 
 
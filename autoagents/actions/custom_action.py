@@ -82,6 +82,8 @@ OUTPUT_MAPPING = {
     "ActionInput": (str, ...),
 }
 
+DYNAMIC_FIELDS = ("context", "previous", "suggestions", "completed_steps")
+
 INTERMEDIATE_OUTPUT_MAPPING = {
     "Step": (str, ...),
     "Response": (str, ...),
@@ -142,7 +144,9 @@ class CustomAction(Action):
         # exit()
         
         tools = list(self.tool) + ['Print', 'Write File', 'Final Output']
-        prompt = PROMPT_TEMPLATE.format(
+        prompt, system_msgs = self._compose_prompt(
+            PROMPT_TEMPLATE,
+            DYNAMIC_FIELDS,
             context=task_context,
             previous=previous_context,
             role=self.role_prompt,
@@ -152,7 +156,7 @@ class CustomAction(Action):
             format_example=FORMAT_EXAMPLE
         )
 
-        rsp = await self._aask_v1(prompt, "task", OUTPUT_MAPPING)
+        rsp = await self._aask_v1(prompt, "task", OUTPUT_MAPPING, system_msgs)
 
         if 'Write File' in rsp.instruct_content.Action:
             ai_text = str(rsp.instruct_content.ActionInput)
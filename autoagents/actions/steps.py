@@ -70,6 +70,8 @@ OUTPUT_MAPPING = {
     "NecessaryInformation": (str, ...),
 }
 
+DYNAMIC_FIELDS = ("task", "history", "states")
+
 class NextAction(Action):
 
     def __init__(self, name="NextAction", context=None, llm=None, **kwargs):
@@ -77,13 +79,14 @@ class NextAction(Action):
         
     async def run(self, context):
         
-        prompt = OBSERVER_TEMPLATE.format(task=context[0],
-                                        roles=context[1],
-                                        history=context[2],
-                                        states=context[3],
-                                        format_example=FORMAT_EXAMPLE,
-                                        )
-
-        rsp = await self._aask_v1(prompt, "task", OUTPUT_MAPPING)
+        prompt, system_msgs = self._compose_prompt(OBSERVER_TEMPLATE, DYNAMIC_FIELDS,
+                                                   task=context[0],
+                                                   roles=context[1],
+                                                   history=context[2],
+                                                   states=context[3],
+                                                   format_example=FORMAT_EXAMPLE,
+                                                   )
+
+        rsp = await self._aask_v1(prompt, "task", OUTPUT_MAPPING, system_msgs)
 
         return rsp
@@ -16,21 +16,25 @@ from typing import Iterable
 
 from pydantic import BaseModel, Field
 
+import cfg
 from .roles import Role
 from .actions import Requirement
 from .roles import CustomRole, ActionObserver, Group, ROLES_LIST, ROLES_MAPPING
 
-from .system.memory import Memory
+from .system.memory import Memory, IndexedMemory
 from .system.const import WORKSPACE_ROOT
 from pathlib import Path
 from .system.schema import Message
+from .system.provider.stream import reset_stream_sink, set_stream_sink
+from .system.scheduler import EventScheduler
+from .system.artifacts import ArtifactWriter, artifact_record
 
 class Environment(BaseModel):
     """Environment hosting multiple roles; roles publish messages here, observable by others."""
 
     roles: dict[str, Role] = Field(default_factory=dict)
-    memory: Memory = Field(default_factory=Memory)
-    history: str = Field(default='')
+    memory: Memory = Field(default_factory=lambda: IndexedMemory() if cfg.MEMORY_FULL_TEXT_INDEX else Memory())
+    history_parts: list[str] = Field(default_factory=list)
     new_roles_args: dict = Field(default_factory=dict)
     new_roles: dict[str, Role] = Field(default_factory=dict)
     steps: list = Field(default_factory=list)
@@ -42,15 +46,23 @@ class Environment(BaseModel):
     serpapi_key: str = Field(default='')
     alg_msg_queue: object = Field(default=None)
     log_dir: Path | None = Field(default=None)
+    scheduler: EventScheduler | None = Field(default=None)
+    artifacts: ArtifactWriter | None = Field(default=None)
 
     class Config:
         arbitrary_types_allowed = True
 
+    @property
+    def history(self) -> str:
+        """Every published message, one per line, joined on demand."""
+        return "".join(self.history_parts)
 
     def add_role(self, role: Role):
         """Add a Role to the current environment."""
         role.set_env(self)
         self.roles[role.profile] = role
+        if self.scheduler is not None:
+            self.scheduler.subscribe(role.profile, role)
 
     def add_roles(self, roles: Iterable[Role]):
         """Add multiple Roles to the current environment."""
@@ -127,70 +139,36 @@ class Environment(BaseModel):
         # init_actions.append(Requirement)
         # self.add_role(ActionObserver(steps=plan, watch_actions=init_actions, init_actions=watch_actions, proxy=self.proxy, llm_api_key=self.llm_api_key))
 
-    async def publish_message(self, message: Message):
-        """Publish a message to the current environment."""
-        # self.message_queue.put(message)
-        self.memory.add(message)
-        self.history += f"\n{message}"
-
-        # Initialize per-task log directory on first message
-        if self.log_dir is None:
-            try:
-                safe_task = (self.task_id or timestamp()).replace('/', '-').replace(' ', '_')
-                base = WORKSPACE_ROOT / 'agents_logs' / safe_task
-                base.mkdir(parents=True, exist_ok=True)
-                self.log_dir = base
-            except Exception:
-                # Fallback: ensure workspace exists and continue without raising
-                (WORKSPACE_ROOT / 'agents_logs').mkdir(parents=True, exist_ok=True)
-
-        # Persist environment history and per-agent process/result
+    def _log_artifacts(self, message: Message, history_entry: str):
+        """Queue the history, per-agent process and result logs for the background writer."""
+        if cfg.ENV_ARTIFACTS == 'none':
+            return
         try:
-            # Save full environment history
-            if self.log_dir:
-                history_path = self.log_dir / 'history.md'
-                history_path.write_text(self.history)
-
-                # Per-agent logs
-                role_name = (message.role or 'Unknown').strip()
-                # Skip empty/observer-only roles in dedicated dirs if needed
-                safe_role = role_name.replace('/', '-').replace(' ', '_')
-                role_dir = self.log_dir / safe_role
-                role_dir.mkdir(parents=True, exist_ok=True)
-
-                # Append to process log
-                process_path = role_dir / 'process.md'
-                with process_path.open('a', encoding='utf-8') as f:
-                    f.write(f"\n## [{timestamp()}] {role_name}\n")
-                    if message.cause_by:
-                        f.write(f"Action: {getattr(message.cause_by, '__name__', str(message.cause_by))}\n\n")
-                    content = message.instruct_content.dict() if getattr(message, 'instruct_content', None) else None
-                    if content:
-                        f.write("Content (instruct):\n")
-                        for k, v in content.items():
-                            f.write(f"- {k}: {v}\n")
-                        f.write("\n")
-                    f.write("Message:\n")
-                    f.write(str(message.content).rstrip() + "\n")
-
-                # Update latest result for this agent
-                result_path = role_dir / 'result.md'
-                # Prefer a clean result: instruct Response if present, else content
-                result_text = None
-                if getattr(message, 'instruct_content', None):
-                    try:
-                        ic = message.instruct_content
-                        # Common keys: Response or summary-like
-                        result_text = getattr(ic, 'Response', None) or getattr(ic, 'Summary', None)
-                    except Exception:
-                        result_text = None
-                if not result_text:
-                    result_text = message.content
-                result_path.write_text(str(result_text))
+            if self.artifacts is None:
+                # Initialize per-task log directory on first message; the writer creates it
+                if self.log_dir is None:
+                    safe_task = (self.task_id or timestamp()).replace('/', '-').replace(' ', '_')
+                    self.log_dir = WORKSPACE_ROOT / 'agents_logs' / safe_task
+                self.artifacts = ArtifactWriter(self.log_dir)
+            self.artifacts.submit(artifact_record(message, history_entry, timestamp()))
         except Exception:
             # Logging to files should never break runtime
             pass
 
+    def close(self):
+        """Flush pending artifacts and stop the writer."""
+        if self.artifacts is not None:
+            self.artifacts.close()
+            self.artifacts = None
+
+    async def publish_message(self, message: Message):
+        """Publish a message to the current environment."""
+        # self.message_queue.put(message)
+        self.memory.add(message)
+        history_entry = f"\n{message}"
+        self.history_parts.append(history_entry)
+        self._log_artifacts(message, history_entry)
+
         if 'Manager' in message.role:
             self.steps = self._parser_plan(message.content)
             self.new_roles_args = self._parser_roles(message.content)
@@ -237,10 +215,40 @@ class Environment(BaseModel):
             if self.alg_msg_queue:
                 self.alg_msg_queue.put_nowait(format_message(action=MessageType.RunTask.value, data={'task_id': self.task_id, 'task_message':msg}))
 
-
+        if self.scheduler is not None:
+            self.scheduler.notify(message)
+
+    def publish_delta(self, delta: str, tags: dict):
+        """Forward a streamed LLM delta to the frontend queue as it arrives."""
+        if not self.alg_msg_queue:
+            return
+        data = {
+            'task_id': self.task_id,
+            'role': tags.get('role'),
+            'action': tags.get('action'),
+            'step': tags.get('step'),
+            'delta': delta,
+        }
+        try:
+            self.alg_msg_queue.put_nowait(format_message(action=MessageType.StreamDelta.value, data=data))
+        except Exception:
+            # Streaming previews should never break runtime
+            pass
 
     async def run(self, k=1):
-        """Run all roles once per round, for k rounds."""
+        """Run all roles once per round, for k rounds, or until no role has pending input in event mode."""
+        token = set_stream_sink(self.publish_delta) if self.alg_msg_queue else None
+        try:
+            if cfg.ENV_SCHEDULER == 'event':
+                await self._run_events()
+            else:
+                await self._run_rounds(k)
+        finally:
+            if token is not None:
+                reset_stream_sink(token)
+
+    async def _run_rounds(self, k: int):
+        """Run all roles once per round for k rounds, then the roles created since until the plan is done."""
         old_roles = []
         for _ in range(k):
             futures = []
@@ -263,6 +271,14 @@ class Environment(BaseModel):
 
                 await asyncio.gather(*futures)
 
+    async def _run_events(self):
+        """Wake only the roles watching newly published messages until none has pending input."""
+        if self.scheduler is None:
+            self.scheduler = EventScheduler(self)
+            for name, role in self.roles.items():
+                self.scheduler.subscribe(name, role)
+        await self.scheduler.run()
+
     def get_roles(self) -> dict[str, Role]:
         """Get all roles in the environment."""
         return self.roles
@@ -13,6 +13,8 @@ from .environment import Environment
 
 import cfg
 from .system.logs import logger
+from .system.provider.http_pool import aclose_sessions
+from .system.provider.registry import LLMRegistry
 from .system.schema import Message
 from .system.utils.common import NoMoneyException
 
@@ -49,10 +51,15 @@ class Explorer(BaseModel):
         logger.info(self.json())
 
     async def run(self, n_round=3):
-        while n_round > 0:
-            # self._save()
-            n_round -= 1
-            logger.debug(f"{n_round=}")
-            self._check_balance()
-            await self.environment.run()
+        try:
+            while n_round > 0:
+                # self._save()
+                n_round -= 1
+                logger.debug(f"{n_round=}")
+                self._check_balance()
+                await self.environment.run()
+        finally:
+            self.environment.close()
+            logger.debug(f"LLM clients: {LLMRegistry().stats()}")
+            await aclose_sessions()
         return self.environment.history
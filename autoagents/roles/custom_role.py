@@ -30,7 +30,7 @@ class CustomRole(Role):
 
         completed_steps = ''
         addition = f"\n### Completed Steps and Responses\n{completed_steps}\n###"
-        context = str(self._rc.important_memory) + addition
+        context = self._assembler.render(self._rc.important_memory) + addition
         response = await self._rc.todo.run(context)
 
         if hasattr(response.instruct_content, 'Action'):
@@ -42,7 +42,7 @@ class CustomRole(Role):
                 completed_steps += '\n You should synthesize the responses of previous steps and provide the final feedback.'
             
             addition = f"\n### Completed Steps and Responses\n{completed_steps}\n###"
-            context = str(self._rc.important_memory) + addition
+            context = self._assembler.render(self._rc.important_memory) + addition
             response = await self._rc.todo.run(context)
 
             if hasattr(response.instruct_content, 'Action'):
@@ -3,13 +3,15 @@
 
 import re
 import asyncio
+
+import cfg
 from autoagents.actions import Action, ActionOutput
 from autoagents.roles import Role
 from autoagents.system.logs import logger
+from autoagents.system.provider.rate_limiter import track_rate_limit_wait
+from autoagents.system.provider.stream import stream_tags
 from autoagents.system.schema import Message
-from autoagents.actions import NextAction, CustomAction, Requirement
-
-SLEEP_RATE = 30 # sleep between calls
+from autoagents.actions import NextAction, CustomAction
 
 CONTENT_TEMPLATE ="""
 ## Previous Steps and Responses
@@ -19,11 +21,35 @@ CONTENT_TEMPLATE ="""
 {step}
 """
 
+_DEPENDS_ON = re.compile(r"\(\s*depends on\s*:?([^)]*)\)", re.IGNORECASE)
+
+
+def parse_step_dependencies(steps: list[str]) -> list[set[int]]:
+    """Return, for each plan step, the indexes of the earlier steps it depends on.
+
+    Steps are annotated with 1-based plan numbers, e.g. "(depends on: 1, 3)" or
+    "(depends on: none)". Unannotated steps depend on the previous step, so a plan
+    without annotations runs in order, and the final synthesis step depends on all.
+    """
+    deps = []
+    for i, step in enumerate(steps):
+        match = _DEPENDS_ON.search(step)
+        if match is None:
+            deps.append({i - 1} if i else set())
+        else:
+            # Only earlier steps count, which keeps the graph acyclic
+            deps.append({int(n) - 1 for n in re.findall(r"\d+", match.group(1)) if 0 < int(n) <= i})
+    if deps:
+        deps[-1] = set(range(len(steps) - 1))
+    return deps
+
+
 class Group(Role):
     def __init__(self, roles, steps, watch_actions, name="Alex", profile="Group", goal="Effectively delivering information according to plan.", constraints="", **kwargs):
         self.steps = steps
         self.roles = roles
         self.next_state = []
+        self.rate_limit_wait = 0.0
         self._watch_action = watch_actions[-1]
         super().__init__(name, profile, goal, constraints, **kwargs)
         init_actions = []
@@ -57,72 +83,117 @@ class Group(Role):
             print('*******Next Steps********')
             print(states_prompt)
             print('************************')
-            self.next_state = []                
-            for i, state in enumerate(self._actions):
-                name = str(state).replace('_Action', '').replace('_', ' ')
-                if name in self.next_step.split(':')[0]:
-                    self.next_state.append(i)
+            self.next_state = self._states_for(self.next_step)
         else:
             if len(self.steps) > 0:
                 self.steps.pop(0)
             self.next_step = ''
             self.next_role = ''
 
-    async def _act(self) -> Message:
-        if self.next_step == '':
-            return Message(content='', role='')
-        
+    def _states_for(self, step: str) -> list[int]:
+        """Indexes of the actions of the roles named in the step."""
+        states = []
+        for i, state in enumerate(self._actions):
+            name = str(state).replace('_Action', '').replace('_', ' ')
+            if name in step.split(':')[0]:
+                states.append(i)
+        return states
+
+    def _step_message(self, response) -> Message:
+        if isinstance(response, ActionOutput):
+            return Message(content=response.content, instruct_content=response.instruct_content, cause_by=self._watch_action)
+        return Message(content=response, cause_by=self._watch_action)
+
+    async def _run_role(self, state: int, step: str, context: str):
+        # Roles and steps may run concurrently, so use the action directly instead of the shared todo
+        todo = self._actions[state]
+        logger.info(f"{self._setting}: ready to {todo}")
+        with stream_tags(step=step):
+            return await todo.run(context)
+
+    def _merge_response(self, state: int, response, completed_steps: str, agreed: int) -> tuple[str, int]:
+        """Append a role's substep to the completed steps, or mark the role as agreeing."""
+        if hasattr(response.instruct_content, 'Action'):
+            completed_steps += f'>{self._actions[state]} Substep:\n' + response.instruct_content.Action + '\n>Subresponse:\n' + response.instruct_content.Response + '\n'
+            return completed_steps, agreed
+        return completed_steps, 1
+
+    async def _run_step(self, step: str, states: list[int], previous: str):
+        """Let the roles of one step iterate on it until they agree or the substep limit is hit."""
         completed_steps, num_steps = '', 5
-        message = CONTENT_TEMPLATE.format(previous=str(self._rc.important_memory), step=self.next_step)
+        message = CONTENT_TEMPLATE.format(previous=previous, step=step)
         # context = str(self._rc.important_memory) + addition
 
-        steps, consensus = 0, [0 for i in self.next_state]
-        while len(self.next_state) > sum(consensus) and steps < num_steps:
-
-            if steps > num_steps - 2:
-                completed_steps += '\n You should synthesize the responses of previous steps and provide the final feedback.'
-                
-            for i, state in enumerate(self.next_state):
-                self._set_state(state)
-                logger.info(f"{self._setting}: ready to {self._rc.todo}")
-
-                addition = f"\n### Completed Steps and Responses\n{completed_steps}\n###"
-                context = message + addition
-                response = await self._rc.todo.run(context)
-
-                if hasattr(response.instruct_content, 'Action'):
-                    completed_steps += f'>{self._rc.todo} Substep:\n' + response.instruct_content.Action + '\n>Subresponse:\n' + response.instruct_content.Response + '\n'
+        steps, consensus = 0, [0 for i in states]
+        response = ''
+        # Pacing is left to the shared rate limiter, which only waits when the provider's limits are reached
+        with track_rate_limit_wait() as waited:
+            while len(states) > sum(consensus) and steps < num_steps:
+
+                if steps > num_steps - 2:
+                    completed_steps += '\n You should synthesize the responses of previous steps and provide the final feedback.'
+
+                if cfg.GROUP_PARALLEL_ROLES:
+                    # Every role starts from the same context; results are merged in role order
+                    context = message + f"\n### Completed Steps and Responses\n{completed_steps}\n###"
+                    responses = await asyncio.gather(*(self._run_role(state, step, context) for state in states))
+                    for i, (state, response) in enumerate(zip(states, responses)):
+                        completed_steps, consensus[i] = self._merge_response(state, response, completed_steps, consensus[i])
                 else:
-                    consensus[i] = 1
-                # Avoid blocking the event loop; yield control while waiting
-                await asyncio.sleep(SLEEP_RATE)
+                    for i, state in enumerate(states):
+                        context = message + f"\n### Completed Steps and Responses\n{completed_steps}\n###"
+                        response = await self._run_role(state, step, context)
+                        completed_steps, consensus[i] = self._merge_response(state, response, completed_steps, consensus[i])
 
-            steps += 1
+                steps += 1
 
+        self.rate_limit_wait += waited.seconds
+        logger.info(f"{self._setting}: step finished after {steps} rounds, {waited.seconds:.2f}s waiting on rate limits "
+                    f"({self.rate_limit_wait:.2f}s in total)")
         # response.content = completed_steps
-        requirement_type = type('Requirement_Group', (Requirement,), {})
-        if isinstance(response, ActionOutput):
-            msg = Message(content=response.content, instruct_content=response.instruct_content, cause_by=self._watch_action)
-        else:
-            msg = Message(content=response, cause_by=self._watch_action)
-        # self._rc.memory.add(msg)
+        return response
+
+    async def _act(self) -> Message:
+        if self.next_step == '':
+            return Message(content='', role='')
+        if cfg.GROUP_MAX_PARALLEL_STEPS > 1 and len(self.steps) > 1:
+            return await self._act_plan()
 
-        return msg
-
-    async def _observe(self) -> int:
-        """Observe the environment, collect relevant information, and add to memory."""
-        if not self._rc.env:
-            return 0
-        env_msgs = self._rc.env.memory.get()
-        
-        observed = self._rc.env.memory.get_by_actions(self._rc.watch)
-        
-        news = self._rc.memory.remember(observed)  # remember recent exact or similar memories
-
-        for i in env_msgs:
-            self.recv(i)
-
-        news_text = [f"{i.role}: {i.content[:20]}..." for i in news]
-        if news_text:
-            logger.debug(f'{self._setting} observed: {news_text}')
-        return len(news)
+        previous = self._assembler.render(self._rc.important_memory, query=self.next_step)
+        response = await self._run_step(self.next_step, self.next_state, previous)
+        # self._rc.memory.add(msg)
+        return self._step_message(response)
+
+    async def _act_plan(self) -> Message:
+        """Run the remaining plan as a dependency graph, starting every ready step up to the concurrency cap.
+
+        Each step sees the results completed so far in plan order, so the final
+        synthesis step reads them in the order the Manager planned them.
+        """
+        plan = list(self.steps)
+        deps = parse_step_dependencies(plan)
+        base = list(self._rc.important_memory)
+        results: dict[int, Message] = {}
+        pending = list(range(len(plan)))
+        running: dict[asyncio.Future, int] = {}
+        try:
+            while pending or running:
+                ready = [i for i in pending if deps[i] <= results.keys()]
+                for i in ready[:max(0, cfg.GROUP_MAX_PARALLEL_STEPS - len(running))]:
+                    pending.remove(i)
+                    previous = self._assembler.render(base + [results[j] for j in sorted(results)], query=plan[i])
+                    logger.info(f"{self._setting}: starting step {i + 1}/{len(plan)}: {plan[i]}")
+                    running[asyncio.ensure_future(self._run_step(plan[i], self._states_for(plan[i]), previous))] = i
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=running.get):
+                    i = running.pop(task)
+                    results[i] = self._step_message(task.result())
+                    self._rc.memory.add(results[i])
+                    if i < len(plan) - 1:
+                        await self._publish_message(results[i])
+        finally:
+            for task in running:
+                task.cancel()
+        self.steps.clear()
+        self.next_step = ''
+        return results[len(plan) - 1]
@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import asyncio
 from typing import Iterable, Type
 
 from pydantic import BaseModel, Field
 
+import cfg
 from autoagents.actions import Requirement, CreateRoles, CheckRoles, CheckPlans
 from autoagents.roles import Role
 
@@ -21,6 +23,8 @@ class Manager(Role):
         self._watch([Requirement])
 
     async def _act(self) -> Message:
+        if cfg.MANAGER_PARALLEL_CHECKS:
+            return await self._act_parallel()
         logger.info(f"{self._setting}: ready to {self._rc.todo}")
 
         roles_plan, suggestions_roles, suggestions_plan = '', '', ''
@@ -57,3 +61,49 @@ class Manager(Role):
         self._rc.memory.add(msg)
 
         return msg
+
+    async def _check(self, state: int, content: str, history: str) -> str:
+        rsp = await self._actions[state].run(content, history=history)
+        return rsp.instruct_content.Suggestions
+
+    async def _act_parallel(self) -> Message:
+        """Create roles and plan, critiquing roles and plan concurrently until the critiques converge."""
+        logger.info(f"{self._setting}: ready to {self._rc.todo}")
+
+        roles_plan, suggestions_roles, suggestions_plan = '', '', ''
+        suggestions, num_steps = '', 3
+        last_critique = None
+
+        for steps in range(num_steps):
+            self._set_state(0)
+            response = await self._rc.todo.run(self._rc.important_memory, history=roles_plan, suggestions=suggestions)
+            roles_plan = str(response.instruct_content)
+            if steps == num_steps - 1:
+                # Critiques of the final plan would never be acted on
+                break
+
+            history_roles = f"## Role Suggestions\n{suggestions_roles}\n\n## Feedback\n{response.instruct_content.RoleFeedback}"
+            history_plan = f"## Plan Suggestions\n{suggestions_plan}\n\n## Feedback\n{response.instruct_content.PlanFeedback}"
+            role_critique, plan_critique = await asyncio.gather(
+                self._check(1, response.content, history_roles),
+                self._check(2, response.content, history_plan),
+            )
+            suggestions_roles += role_critique
+            suggestions_plan += plan_critique
+            suggestions = f"## Role Suggestions\n{role_critique}\n\n## Plan Suggestions\n{plan_critique}"
+
+            if 'No Suggestions' in suggestions_roles and 'No Suggestions' in suggestions_plan:
+                break
+            critique = (role_critique.strip(), plan_critique.strip())
+            if critique == last_critique:
+                logger.info("Role and plan critiques repeated themselves; stopping the planning loop")
+                break
+            last_critique = critique
+
+        # Publish under the same action as the sequential loop, which ends on CheckPlans
+        self._set_state(2)
+        msg = Message(content=response.content, instruct_content=response.instruct_content,
+                      role=self.profile, cause_by=type(self._rc.todo))
+        self._rc.memory.add(msg)
+
+        return msg
@@ -3,7 +3,6 @@
 
 from autoagents.actions import CheckRoles, CheckPlans, CreateRoles
 from autoagents.roles import Role
-from autoagents.system.logs import logger
 
 
 class ObserverAgents(Role):
@@ -21,20 +20,8 @@ class ObserverPlans(Role):
         self._init_actions([CheckPlans])
         self._watch([CreateRoles,CheckRoles])
 
-    async def _observe(self) -> int:
-        """Observe the environment, collect relevant information, and add to memory."""
-        if not self._rc.env:
-            return 0
-        env_msgs = self._rc.env.memory.get()
-        
-        observed = self._rc.env.memory.get_by_and_actions(self._rc.watch)
-        
-        news = self._rc.memory.remember(observed)  # remember recent exact or similar memories
-
-        for i in env_msgs:
-            self.recv(i)
-
-        news_text = [f"{i.role}: {i.content[:20]}..." for i in news]
-        if news_text:
-            logger.debug(f'{self._setting} observed: {news_text}')
-        return len(news)
+    def _select_observed(self, messages):
+        """React only once every watched action has produced a message."""
+        if not all(self._rc.env.memory.index.get(action) for action in self._rc.watch):
+            return []
+        return super()._select_observed(messages)
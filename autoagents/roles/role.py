@@ -3,15 +3,16 @@
 # From: https://github.com/geekan/MetaGPT/blob/main/metagpt/roles/role.py
 from __future__ import annotations
 
-from typing import Iterable, Type
+from typing import Iterable, Type, Union
 
 from pydantic import BaseModel, Field
 
 from autoagents.actions import Action, ActionOutput
 import cfg
-from autoagents.system.llm import LLM
+from autoagents.system.llm import get_llm
 from autoagents.system.logs import logger
-from autoagents.system.memory import Memory, LongTermMemory
+from autoagents.system.memory import ContextAssembler, Memory, MemoryView, LongTermMemory
+from autoagents.system.provider.stream import stream_tags
 from autoagents.system.schema import Message
 
 PREFIX_TEMPLATE = """You are a {profile}, named {name}, your goal is {goal}, and the constraint is {constraints}. """
@@ -60,11 +61,12 @@ class RoleSetting(BaseModel):
 class RoleContext(BaseModel):
     """Runtime context for a role."""
     env: 'Environment' = Field(default=None)
-    memory: Memory = Field(default_factory=Memory)
+    memory: Union[Memory, MemoryView] = Field(default_factory=Memory)
     long_term_memory: LongTermMemory = Field(default_factory=LongTermMemory)
     state: int = Field(default=0)
     todo: Action = Field(default=None)
     watch: set[Type[Action]] = Field(default_factory=set)
+    env_cursor: int = Field(default=0)  # offset of the first env message not yet observed
 
     class Config:
         arbitrary_types_allowed = True
@@ -88,13 +90,14 @@ class Role:
     """Role/Agent."""
 
     def __init__(self, name="", profile="", goal="", constraints="", desc="", proxy="", llm_api_key="", serpapi_api_key=""):
-        self._llm = LLM(proxy, llm_api_key)
+        self._llm = get_llm(proxy, llm_api_key)
         self._setting = RoleSetting(name=name, profile=profile, goal=goal, constraints=constraints, desc=desc)
         self._states = []
         self._actions = []
         self.init_actions = None
         self._role_id = str(self._setting)
         self._rc = RoleContext()
+        self._assembler = ContextAssembler()
         self._proxy = proxy
         self._llm_api_key = llm_api_key
         self._serpapi_api_key = serpapi_api_key
@@ -127,9 +130,19 @@ class Role:
         logger.debug(self._actions)
         self._rc.todo = self._actions[self._rc.state]
 
+    @property
+    def watch(self) -> set[Type[Action]]:
+        """Action types whose messages this role reacts to."""
+        return self._rc.watch
+
     def set_env(self, env: 'Environment'):
         """Set the environment where the role operates and communicates."""
         self._rc.env = env
+        if not isinstance(self._rc.memory, LongTermMemory):
+            # Read the environment's message log instead of keeping a copy of every message
+            received = self._rc.memory.get()
+            self._rc.memory = MemoryView(env.memory)
+            self._rc.memory.add_batch(received)
 
     @property
     def profile(self):
@@ -149,7 +162,7 @@ class Role:
             self._set_state(0)
             return
         prompt = self._get_prefix()
-        prompt += STATE_TEMPLATE.format(history=self._rc.history, states="\n".join(self._states),
+        prompt += STATE_TEMPLATE.format(history=self._assembler.render(self._rc.history), states="\n".join(self._states),
                                         n_states=len(self._states) - 1)
         next_state = await self._llm.aask(prompt)
         logger.debug(f"{prompt=}")
@@ -176,14 +189,19 @@ class Role:
 
         return msg
 
+    def _select_observed(self, messages: list[Message]) -> list[Message]:
+        """Pick the newly published messages this role reacts to."""
+        return [m for m in messages if m.cause_by in self._rc.watch]
+
     async def _observe(self) -> int:
         """Observe the environment, gather relevant information, and add to memory."""
         if not self._rc.env:
             return 0
-        env_msgs = self._rc.env.memory.get()
-        
-        observed = self._rc.env.memory.get_by_actions(self._rc.watch)
-        
+        # Only read what was published since the last observation
+        env_msgs, self._rc.env_cursor = self._rc.env.memory.since(self._rc.env_cursor)
+
+        observed = [m for m in self._select_observed(env_msgs) if m not in self._rc.memory]
+
         news = self._rc.memory.remember(observed)  # remember recent exact or similar memories
 
         for i in env_msgs:
@@ -203,15 +221,16 @@ class Role:
 
     async def _react(self) -> Message:
         """Think then act."""
-        await self._think()
-        logger.debug(f"{self._setting}: {self._rc.state=}, will do {self._rc.todo}")
-        return await self._act()
+        with stream_tags(role=self.profile):
+            await self._think()
+            logger.debug(f"{self._setting}: {self._rc.state=}, will do {self._rc.todo}")
+            return await self._act()
 
     def recv(self, message: Message) -> None:
         """add message to history."""
         # self._history += f"\n{message}"
         # self._context = self._history
-        if message in self._rc.memory.get():
+        if message in self._rc.memory:
             return
         self._rc.memory.add(message)
 
@@ -5,46 +5,29 @@
 @Author  : alexanderwu
 @From    : https://github.com/geekan/MetaGPT/blob/main/metagpt/roles/engineer.py
 """
-import asyncio
 import shutil
-from collections import OrderedDict
 from pathlib import Path
 
 from autoagents.system.const import WORKSPACE_ROOT
 from autoagents.system.logs import logger
 from autoagents.system.schema import Message
+from autoagents.system.utils.async_pool import bounded_as_completed
 from autoagents.system.utils.common import CodeParser
 from autoagents.system.utils.special_tokens import MSG_SEP, FILENAME_CODE_SEP
 from autoagents.roles import Role
 from autoagents.actions import WriteCode, WriteCodeReview, WriteTasks, WriteDesign
 
 async def gather_ordered_k(coros, k) -> list:
-    tasks = OrderedDict()
     results = [None] * len(coros)
-    done_queue = asyncio.Queue()
-
-    for i, coro in enumerate(coros):
-        if len(tasks) >= k:
-            done, _ = await asyncio.wait(tasks.keys(), return_when=asyncio.FIRST_COMPLETED)
-            for task in done:
-                index = tasks.pop(task)
-                await done_queue.put((index, task.result()))
-        task = asyncio.create_task(coro)
-        tasks[task] = i
-
-    if tasks:
-        done, _ = await asyncio.wait(tasks.keys())
-        for task in done:
-            index = tasks[task]
-            await done_queue.put((index, task.result()))
-
-    while not done_queue.empty():
-        index, result = await done_queue.get()
+    async for index, result in bounded_as_completed(_await, coros, k):
         results[index] = result
-
     return results
 
 
+async def _await(coro):
+    return await coro
+
+
 class Engineer(Role):
     def __init__(self, name="Alex", profile="Engineer", goal="Write elegant, readable, extensible, efficient code",
                  constraints="The code you write should conform to code standard like PEP8, be modular, easy to read and maintain",
@@ -131,7 +114,7 @@ class Engineer(Role):
         code_msg_all = [] # gather all code info, will pass to qa_engineer for tests later
         for todo in self.todos:
             code = await WriteCode(llm=self._llm).run(
-                context=self._rc.history,
+                context=self._assembler.render(self._rc.history, query=todo),
                 filename=todo
             )
             # logger.info(todo)
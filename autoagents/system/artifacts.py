@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Background writer for the per-task run artifacts.
+
+Publishing a message only snapshots it into a record and queues it; a
+daemon thread drains the queue in batches every `flush_interval` seconds and
+appends `history.md` and each role's `process.md`, rewrites each role's
+`result.md` once per batch, and/or appends every record to one `events.jsonl`
+log. Pending records are flushed on `close()` and at interpreter exit.
+"""
+import atexit
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import cfg
+from autoagents.system.logs import logger
+from autoagents.system.schema import Message
+
+MARKDOWN = "markdown"
+JSONL = "jsonl"
+BOTH = "both"
+
+_STOP = object()
+
+
+def artifact_record(message: Message, history_entry: str, ts: str) -> dict:
+    """Snapshot what the artifacts need from `message`, so the writer never touches live objects."""
+    instruct = message.instruct_content.dict() if getattr(message, 'instruct_content', None) else None
+    result = None
+    if instruct:
+        # Prefer a clean result: instruct Response if present, else content
+        result = instruct.get('Response') or instruct.get('Summary')
+    return {
+        "timestamp": ts,
+        "role": (message.role or 'Unknown').strip(),
+        "action": getattr(message.cause_by, '__name__', str(message.cause_by)) if message.cause_by else None,
+        "content": str(message.content),
+        "instruct": instruct,
+        "result": str(result or message.content),
+        "history": history_entry,
+    }
+
+
+def _process_entry(record: dict) -> str:
+    lines = [f"\n## [{record['timestamp']}] {record['role']}\n"]
+    if record["action"]:
+        lines.append(f"Action: {record['action']}\n\n")
+    if record["instruct"]:
+        lines.append("Content (instruct):\n")
+        lines.extend(f"- {k}: {v}\n" for k, v in record["instruct"].items())
+        lines.append("\n")
+    lines.append("Message:\n")
+    lines.append(record["content"].rstrip() + "\n")
+    return "".join(lines)
+
+
+class ArtifactWriter:
+    """Append run artifacts from a daemon thread, batching the queued records."""
+
+    def __init__(self, log_dir: Path, mode: str = None, flush_interval: float = None):
+        self.log_dir = Path(log_dir)
+        self.mode = mode or cfg.ENV_ARTIFACTS
+        self.flush_interval = cfg.ENV_ARTIFACT_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self.records = 0
+        self.batches = 0
+        self.errors = 0
+        self._history_started = False
+        self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, record: dict):
+        """Queue one record; never blocks and never raises."""
+        if not self._closed:
+            self._queue.put_nowait(record)
+
+    def _run(self):
+        while True:
+            batch, stop = [], False
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: list[dict]):
+        try:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            if self.mode in (MARKDOWN, BOTH):
+                self._write_markdown(batch)
+            if self.mode in (JSONL, BOTH):
+                with (self.log_dir / 'events.jsonl').open('a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch)
+            self.records += len(batch)
+            self.batches += 1
+        except Exception as e:
+            # Logging to files should never break runtime
+            self.errors += 1
+            logger.warning(f"Failed to write {len(batch)} artifact records to {self.log_dir}: {e}")
+
+    def _write_markdown(self, batch: list[dict]):
+        # history.md holds this run's history only, like the file it replaces
+        with (self.log_dir / 'history.md').open('a' if self._history_started else 'w', encoding='utf-8') as f:
+            f.write("".join(r["history"] for r in batch))
+        self._history_started = True
+
+        by_role = defaultdict(list)
+        for record in batch:
+            by_role[record["role"]].append(record)
+        for role_name, records in by_role.items():
+            role_dir = self.log_dir / role_name.replace('/', '-').replace(' ', '_')
+            role_dir.mkdir(parents=True, exist_ok=True)
+            with (role_dir / 'process.md').open('a', encoding='utf-8') as f:
+                f.write("".join(_process_entry(r) for r in records))
+            # Only the latest result of the batch survives, so write it once
+            (role_dir / 'result.md').write_text(records[-1]["result"])
+
+    def close(self, timeout: float = 10.0):
+        """Flush every queued record and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put_nowait(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "records": self.records,
+            "batches": self.batches,
+            "errors": self.errors,
+            "pending": self._queue.qsize(),
+        }
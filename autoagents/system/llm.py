@@ -5,8 +5,9 @@
 @From    : https://github.com/geekan/MetaGPT/blob/main/metagpt/llm.py
 """
 from .provider.llm_api import LLMAPI as LLM
+from .provider.registry import LLMRegistry, get_llm
 
-DEFAULT_LLM = LLM()
+DEFAULT_LLM = get_llm()
 
 
 async def ai_func(prompt):
@@ -2,5 +2,8 @@
 # -*- coding: utf-8 -*-
 
 from .memory import Memory
+from .memory_view import MemoryView
+from .indexed_memory import IndexedMemory
 from .longterm_memory import LongTermMemory
+from .context_assembler import ContextAssembler
 
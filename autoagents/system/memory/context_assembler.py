@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Token-budgeted rendering of memory messages into prompt context.
+
+Under budget the output is exactly `str(messages)`, so prompts are unchanged
+for short runs. Over budget the first message (the task) and the latest one
+are kept, the others are ranked by recency and relevance to a query, and
+whatever does not fit is truncated or elided.
+"""
+import re
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterable
+
+import cfg
+from autoagents.system.schema import Message
+from autoagents.system.utils.token_counter import count_string_tokens, elide_string_tokens
+
+# Tokens taken by the ", " separator between rendered messages
+_SEPARATOR_TOKENS = 1
+# Tokens reserved for the surrounding brackets, plus slack for tokens merging across part boundaries
+_FRAME_TOKENS = 16
+# Below this many remaining tokens a message is elided instead of truncated
+_MIN_TRUNCATED_TOKENS = 64
+_RECENCY_WEIGHT = 0.6
+_RELEVANCE_WEIGHT = 0.4
+# Message ids whose token counts and running totals are remembered
+_MAX_TRACKED = 4096
+
+_ELISION_MARKER = "...[{n} messages elided]..."
+
+_WORD = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=1024)
+def _words(text: str) -> frozenset:
+    return frozenset(w.lower() for w in _WORD.findall(text) if len(w) > 2)
+
+
+def _relevance(query_words: frozenset, text: str) -> float:
+    if not query_words:
+        return 0.0
+    return len(query_words & _words(text)) / len(query_words)
+
+
+class ContextAssembler:
+    """Render a list of messages within a token budget, caching the rendered output.
+
+    Token counts are kept per message id, together with the running total of
+    the list up to that message, so rendering a history that only grew since
+    the last call counts just the new messages.
+    """
+
+    def __init__(self, budget: int = None, model: str = None, cache_size: int = 32):
+        self.budget = cfg.CONTEXT_TOKEN_BUDGET if budget is None else budget
+        self.model = model or cfg.LLM_MODEL
+        self._cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self._cache_size = cache_size
+        # id -> (content_hash, tokens including the separator)
+        self._costs: "OrderedDict[str, tuple[str, int]]" = OrderedDict()
+        # id -> (fingerprint of the list up to and including it, running total)
+        self._totals: "OrderedDict[str, tuple[int, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, messages: Iterable[Message], query: str = "", budget: int = None) -> str:
+        """Return `str(messages)` if it fits `budget` tokens, otherwise a ranked, shortened rendering."""
+        messages = list(messages)
+        budget = self.budget if budget is None else budget
+        if not budget:
+            return str(messages)
+        chain = self._chain(messages)
+        key = (budget, query, chain[-1] if chain else 0)
+        text = self._cache.get(key)
+        if text is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return text
+        self.misses += 1
+        if self._total(messages, chain) + _FRAME_TOKENS <= budget:
+            text = str(messages)
+        else:
+            text = self._assemble(messages, query, budget)
+        self._cache[key] = text
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return text
+
+    @staticmethod
+    def _chain(messages: list[Message]) -> list[int]:
+        """Fingerprint of each prefix of `messages`; cheap next to encoding them."""
+        chain, fingerprint = [], 0
+        for m in messages:
+            fingerprint = hash((fingerprint, m.id, m.content_hash))
+            chain.append(fingerprint)
+        return chain
+
+    def _cost(self, message: Message) -> int:
+        entry = self._costs.get(message.id)
+        if entry is not None and entry[0] == message.content_hash:
+            return entry[1]
+        cost = count_string_tokens(str(message), self.model) + _SEPARATOR_TOKENS
+        self._costs[message.id] = (message.content_hash, cost)
+        if len(self._costs) > _MAX_TRACKED:
+            self._costs.popitem(last=False)
+        return cost
+
+    def _total(self, messages: list[Message], chain: list[int]) -> int:
+        """Tokens of all `messages`, resuming from the longest prefix already totalled."""
+        start, total = 0, 0
+        for i in range(len(messages) - 1, -1, -1):
+            entry = self._totals.get(messages[i].id)
+            if entry is not None and entry[0] == chain[i]:
+                start, total = i + 1, entry[1]
+                break
+        for i in range(start, len(messages)):
+            total += self._cost(messages[i])
+            self._totals[messages[i].id] = (chain[i], total)
+            if len(self._totals) > _MAX_TRACKED:
+                self._totals.popitem(last=False)
+        return total
+
+    def _assemble(self, messages: list[Message], query: str, budget: int) -> str:
+        n = len(messages)
+        parts = [str(m) for m in messages]
+        costs = [self._cost(m) for m in messages]
+        # Every gap between kept messages becomes one marker; price them all at the widest count
+        marker = count_string_tokens(_ELISION_MARKER.format(n=n), self.model) + _SEPARATOR_TOKENS
+        query_words = _words(query)
+        # Always try to keep the latest message and the task that started the conversation
+        pinned = list(dict.fromkeys([n - 1, 0]))
+        ranked = sorted(
+            (i for i in range(n) if i not in pinned),
+            key=lambda i: _RECENCY_WEIGHT * (i + 1) / n + _RELEVANCE_WEIGHT * _relevance(query_words, parts[i]),
+            reverse=True,
+        )
+        # Nothing kept yet: the whole list is one elided gap
+        remaining = budget - _FRAME_TOKENS - marker
+        kept, order = {}, []
+        for i in pinned + ranked:
+            # Keeping i splits its gap in two, shortens it, or closes it
+            pos = bisect_left(order, i)
+            left = i > 0 and (not pos or order[pos - 1] != i - 1)
+            right = i < n - 1 and (pos == len(order) or order[pos] != i + 1)
+            cost = costs[i] + (left + right - 1) * marker
+            if cost <= remaining:
+                kept[i] = parts[i]
+            elif remaining - (cost - costs[i]) >= _MIN_TRUNCATED_TOKENS:
+                remaining -= cost - costs[i]
+                kept[i] = elide_string_tokens(parts[i], self.model, remaining - _SEPARATOR_TOKENS)
+                cost = remaining
+            else:
+                continue
+            order.insert(pos, i)
+            remaining -= cost
+            if remaining <= 0:
+                break
+
+        rendered, gap = [], 0
+        for i in range(n):
+            if i not in kept:
+                gap += 1
+                continue
+            if gap:
+                rendered.append(_ELISION_MARKER.format(n=gap))
+                gap = 0
+            rendered.append(kept[i])
+        if gap:
+            rendered.append(_ELISION_MARKER.format(n=gap))
+        return "[" + ", ".join(rendered) + "]"
+
+    def stats(self) -> dict:
+        return {"budget": self.budget, "hits": self.hits, "misses": self.misses, "cached": len(self._cache)}
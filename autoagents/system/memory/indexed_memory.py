@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Memory backend with an inverted full-text index and a role index.
+
+Every added message is tokenized once into lower-cased words, and each word
+maps to the ids of the messages containing it. Keyword and prefix queries
+(`search`) then read posting sets instead of scanning message contents.
+`get_by_content` and `try_remember` keep their exact substring semantics:
+the index narrows the candidates and only those are checked with `in`.
+"""
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Iterable
+
+from autoagents.system.schema import Message
+from .memory import Memory
+
+_WORD = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> set[str]:
+    return set(_WORD.findall(str(text).lower()))
+
+
+class IndexedMemory(Memory):
+    """Memory that also indexes messages by word and by role."""
+
+    def __init__(self):
+        super().__init__()
+        self.postings: dict[str, set[str]] = defaultdict(set)  # word -> ids of the messages containing it
+        self.roles: dict[str, dict[str, Message]] = defaultdict(dict)  # role -> id -> message, in insertion order
+        self._vocabulary: list[str] = []  # sorted words, rebuilt lazily for prefix lookups
+        self._vocabulary_dirty = False
+
+    def add(self, message: Message):
+        """Add a new message to storage, while updating the indexes"""
+        count = self.count()
+        super().add(message)
+        if self.count() == count:
+            return
+        for word in _tokens(message.content):
+            if word not in self.postings:
+                self._vocabulary_dirty = True
+            self.postings[word].add(message.id)
+        self.roles[message.role][message.id] = message
+
+    def delete(self, message: Message):
+        """Delete the specified message from storage, while updating the indexes"""
+        offset = self._find(message)
+        if offset < 0:
+            raise ValueError(f"{message!r} is not in memory")
+        stored = self.at(offset)
+        super().delete(stored)
+        for word in _tokens(stored.content):
+            ids = self.postings.get(word)
+            if ids is None:
+                continue
+            ids.discard(stored.id)
+            if not ids:
+                del self.postings[word]
+                self._vocabulary_dirty = True
+        by_role = self.roles.get(stored.role)
+        if by_role is not None:
+            by_role.pop(stored.id, None)
+            if not by_role:
+                del self.roles[stored.role]
+
+    def clear(self):
+        """Clear storage and indexes"""
+        super().clear()
+        self.postings = defaultdict(set)
+        self.roles = defaultdict(dict)
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+
+    def _words_with_prefix(self, prefix: str) -> list[str]:
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self.postings)
+            self._vocabulary_dirty = False
+        i = bisect_left(self._vocabulary, prefix)
+        words = []
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(prefix):
+            words.append(self._vocabulary[i])
+            i += 1
+        return words
+
+    def _ids_of(self, words: Iterable[str]) -> set[str]:
+        ids = set()
+        for word in words:
+            ids |= self.postings.get(word, set())
+        return ids
+
+    def _in_order(self, ids: Iterable[str]) -> list[Message]:
+        return [self.log[slot] for slot in sorted(self.slots[i] for i in ids)]
+
+    def search(self, query: str, prefix: bool = False) -> list[Message]:
+        """Return the messages containing every word of `query`, case-insensitively.
+
+        With `prefix`, the last word matches any word starting with it.
+        """
+        words = _WORD.findall(query.lower())
+        if not words:
+            return []
+        ids = None
+        for i, word in enumerate(words):
+            if prefix and i == len(words) - 1:
+                matched = self._ids_of(self._words_with_prefix(word))
+            else:
+                matched = self.postings.get(word, set())
+            ids = matched if ids is None else ids & matched
+            if not ids:
+                return []
+        return self._in_order(ids)
+
+    def _candidates(self, content: str):
+        """Ids of the messages that may contain `content`, or None when the index cannot narrow it down"""
+        query = content.lower()
+        matches = list(_WORD.finditer(query))
+        if not matches:
+            return None
+        ids = None
+        for match in matches:
+            word = match.group()
+            # A word at an edge of the query may be cut off: it is then a suffix, prefix or part of a word
+            open_start = match.start() == 0
+            open_end = match.end() == len(query)
+            if open_start and open_end:
+                words = [w for w in self.postings if word in w]
+            elif open_start:
+                words = [w for w in self.postings if w.endswith(word)]
+            elif open_end:
+                words = self._words_with_prefix(word)
+            else:
+                words = [word]
+            matched = self._ids_of(words)
+            ids = matched if ids is None else ids & matched
+            if not ids:
+                break
+        return ids
+
+    def get_by_content(self, content: str) -> list[Message]:
+        """Return all messages containing a specified content"""
+        ids = self._candidates(content)
+        if ids is None:
+            return super().get_by_content(content)
+        return [message for message in self._in_order(ids) if content in message.content]
+
+    def try_remember(self, keyword: str) -> list[Message]:
+        """Try to recall all messages containing a specified keyword"""
+        return self.get_by_content(keyword)
+
+    def get_by_role(self, role: str) -> list[Message]:
+        """Return all messages of a specified role"""
+        return list(self.roles.get(role, {}).values())
+
+
+if __name__ == '__main__':
+    import random
+    import time
+
+    from autoagents.actions import Action
+
+    vocabulary = [f"word{i}" for i in range(5000)]
+    for n in (10_000, 100_000):
+        random.seed(0)
+        messages = [Message(" ".join(random.choices(vocabulary, k=100)), role=f"role {i % 7}", cause_by=Action)
+                    for i in range(n)]
+        plain, indexed = Memory(), IndexedMemory()
+        start = time.perf_counter()
+        plain.add_batch(messages)
+        plain_add = time.perf_counter() - start
+        start = time.perf_counter()
+        indexed.add_batch(messages)
+        indexed_add = time.perf_counter() - start
+
+        queries = ["word123 word4567", "ord99", "word4999"]
+        for memory in (plain, indexed):
+            start = time.perf_counter()
+            results = [len(memory.get_by_content(q)) for q in queries]
+            elapsed = (time.perf_counter() - start) / len(queries)
+            print(f"{n} messages, {type(memory).__name__}: add {(indexed_add if memory is indexed else plain_add) / n * 1e6:.1f}us"
+                  f" per message | get_by_content {elapsed * 1e3:.2f}ms per query {results}")
+        start = time.perf_counter()
+        hits = len(indexed.search("word12", prefix=True))
+        print(f"{n} messages, IndexedMemory: prefix search {(time.perf_counter() - start) * 1e3:.2f}ms ({hits} hits)")
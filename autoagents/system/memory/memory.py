@@ -2,30 +2,84 @@
 # -*- coding: utf-8 -*-
 # Modified from https://github.com/geekan/MetaGPT/blob/main/metagpt/memory/memory.py
 
+from bisect import bisect_left
 from collections import defaultdict
-from typing import Iterable, Type
+from typing import Iterable, Iterator, Optional, Type
 
 from autoagents.actions import Action
 from autoagents.system.schema import Message
 
+# Compact the log once it holds more tombstones than this and more than live messages
+_COMPACT_MIN_TOMBSTONES = 64
+
 
 class Memory:
     """The most basic memory: super-memory"""
 
     def __init__(self):
-        """Initialize an empty storage list and an empty index dictionary"""
-        self.storage: list[Message] = []
-        self.index: dict[Type[Action], list[Message]] = defaultdict(list)
+        """Initialize an empty message log and an empty index dictionary"""
+        # Append-only log: every added message gets the next, never reused, offset. A deleted
+        # message leaves a None tombstone so no other message moves; once tombstones pile up
+        # the log is compacted, which renumbers slots but never offsets
+        self.log: list[Optional[Message]] = []
+        self.log_offsets: list[int] = []  # offset of each log slot, ascending
+        self.next_offset = 0
+        self.live = 0
+        self.index: dict[Type[Action], dict[str, Message]] = defaultdict(dict)
+        # Message id -> offset, id -> log slot and content hash -> ids, for O(1) lookups
+        self.offsets: dict[str, int] = {}
+        self.slots: dict[str, int] = {}
+        self.hashes: dict[str, list[str]] = defaultdict(list)
+
+    def _live(self, log: list[Optional[Message]] = None) -> Iterator[Message]:
+        return (message for message in (self.log if log is None else log) if message is not None)
+
+    @property
+    def storage(self) -> list[Message]:
+        """The stored messages in insertion order"""
+        return list(self._live())
+
+    def slot(self, offset: int) -> int:
+        """Return the log slot of the first message at or after `offset`"""
+        return bisect_left(self.log_offsets, offset)
+
+    def at(self, offset: int) -> Message:
+        """Return the message stored at `offset`"""
+        return self.log[self.slot(offset)]
+
+    def between(self, start: int, end: int = None) -> list[Message]:
+        """Return the stored messages with an offset in [start, end)"""
+        end = len(self.log) if end is None else self.slot(end)
+        return list(self._live(self.log[self.slot(start):end]))
+
+    def _find(self, message: Message) -> int:
+        """Return the offset of `message` or of an equal stored message, -1 if absent"""
+        slot = self.slots.get(message.id)
+        if slot is not None and self.log[slot] is message:
+            return self.offsets[message.id]
+        # Equal copies share the content hash; confirm with a full comparison only on a hash match
+        for message_id in self.hashes.get(message.content_hash, ()):
+            if self.log[self.slots[message_id]] == message:
+                return self.offsets[message_id]
+        return -1
+
+    def __contains__(self, message: Message) -> bool:
+        return self._find(message) >= 0
 
     def add(self, message: Message):
         """Add a new message to storage, while updating the index"""
 
-        if message in self.storage:
+        if message in self:
             return
-        self.storage.append(message)
+        self.offsets[message.id] = self.next_offset
+        self.slots[message.id] = len(self.log)
+        self.hashes[message.content_hash].append(message.id)
+        self.log.append(message)
+        self.log_offsets.append(self.next_offset)
+        self.next_offset += 1
+        self.live += 1
         if message.cause_by:
-            self.index[message.cause_by].append(message)
-
+            self.index[message.cause_by][message.id] = message
 
     def add_batch(self, messages: Iterable[Message]):
         for message in messages:
@@ -33,48 +87,89 @@ class Memory:
 
     def get_by_role(self, role: str) -> list[Message]:
         """Return all messages of a specified role"""
-        return [message for message in self.storage if message.role == role]
+        return [message for message in self._live() if message.role == role]
 
     def get_by_content(self, content: str) -> list[Message]:
         """Return all messages containing a specified content"""
-        return [message for message in self.storage if content in message.content]
+        return [message for message in self._live() if content in message.content]
 
     def delete(self, message: Message):
         """Delete the specified message from storage, while updating the index"""
-        self.storage.remove(message)
-        if message.cause_by and message in self.index[message.cause_by]:
-            self.index[message.cause_by].remove(message)
+        offset = self._find(message)
+        if offset < 0:
+            raise ValueError(f"{message!r} is not in memory")
+        stored = self.at(offset)
+        self.log[self.slots.pop(stored.id)] = None
+        self.live -= 1
+        del self.offsets[stored.id]
+        ids = self.hashes[stored.content_hash]
+        ids.remove(stored.id)
+        if not ids:
+            del self.hashes[stored.content_hash]
+        if stored.cause_by:
+            actions = self.index[stored.cause_by]
+            actions.pop(stored.id, None)
+            if not actions:
+                del self.index[stored.cause_by]
+        tombstones = len(self.log) - self.live
+        if tombstones > _COMPACT_MIN_TOMBSTONES and tombstones > self.live:
+            self._compact()
+
+    def _compact(self):
+        """Drop the tombstones; O(n), but only after more than n deletes, so O(1) amortized per delete"""
+        kept = [slot for slot, message in enumerate(self.log) if message is not None]
+        self.log = [self.log[slot] for slot in kept]
+        self.log_offsets = [self.log_offsets[slot] for slot in kept]
+        self.slots = {message.id: slot for slot, message in enumerate(self.log)}
 
     def clear(self):
-        """Clear storage and index"""
-        self.storage = []
-        self.index = defaultdict(list)
+        """Clear storage and index; offsets keep counting from where they were"""
+        self.log = []
+        self.log_offsets = []
+        self.live = 0
+        self.index = defaultdict(dict)
+        self.offsets = {}
+        self.slots = {}
+        self.hashes = defaultdict(list)
 
     def count(self) -> int:
         """Return the number of messages in storage"""
-        return len(self.storage)
+        return self.live
 
     def try_remember(self, keyword: str) -> list[Message]:
         """Try to recall all messages containing a specified keyword"""
-        return [message for message in self.storage if keyword in message.content]
+        return [message for message in self._live() if keyword in message.content]
 
     def get(self, k=0) -> list[Message]:
         """Return the most recent k memories, return all when k=0"""
-        return self.storage[-k:]
+        if not k:
+            return self.storage
+        latest = []
+        for message in reversed(self.log):
+            if message is not None:
+                latest.append(message)
+                if len(latest) == k:
+                    break
+        return latest[::-1]
+
+    def since(self, cursor: int) -> tuple[list[Message], int]:
+        """Return the messages added at or after offset `cursor`, and the cursor to read from next time"""
+        return self.between(cursor), self.next_offset
 
     def remember(self, observed: list[Message], k=10) -> list[Message]:
         """remember the most recent k memories from observed Messages, return all when k=0"""
         already_observed = self.get(k)
+        seen = {m.content_hash for m in already_observed}
         news: list[Message] = []
         for i in observed:
-            if i in already_observed:
+            if i.content_hash in seen and i in already_observed:
                 continue
             news.append(i)
         return news
 
     def get_by_action(self, action: Type[Action]) -> list[Message]:
         """Return all messages triggered by a specified Action"""
-        return self.index[action]
+        return list(self.index.get(action, {}).values())
 
     def get_by_actions(self, actions: Iterable[Type[Action]]) -> list[Message]:
         """Return all messages triggered by specified Actions"""
@@ -82,7 +177,7 @@ class Memory:
         for action in actions:
             if action not in self.index:
                 continue # return []
-            rsp += self.index[action]
+            rsp += self.index[action].values()
         return rsp
     
     def get_by_and_actions(self, actions: Iterable[Type[Action]]) -> list[Message]:
@@ -91,5 +186,32 @@ class Memory:
         for action in actions:
             if action not in self.index:
                 return []
-            rsp += self.index[action]
+            rsp += self.index[action].values()
         return rsp
+
+if __name__ == '__main__':
+    import time
+
+    for n in (10_000, 100_000):
+        messages = [Message(f"message {i}: " + "x" * 500, role=f"role {i % 7}", cause_by=Action) for i in range(n)]
+        memory = Memory()
+        start = time.perf_counter()
+        memory.add_batch(messages)
+        added = time.perf_counter() - start
+
+        probes = messages[::max(1, n // 1000)]
+        start = time.perf_counter()
+        assert all(m in memory for m in probes)
+        indexed = (time.perf_counter() - start) / len(probes)
+        storage = memory.storage
+        start = time.perf_counter()
+        assert all(m in storage for m in probes[:100])
+        scanned = (time.perf_counter() - start) / 100
+
+        # Deleting from the front would move every later message if storage were a plain list
+        start = time.perf_counter()
+        for m in messages[:100]:
+            memory.delete(m)
+        deleted = (time.perf_counter() - start) / 100
+        print(f"{n} messages: add {added / n * 1e6:.2f}us | contains {indexed * 1e6:.2f}us "
+              f"(list scan {scanned * 1e6:.1f}us) | delete {deleted * 1e6:.2f}us per message")
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+A role's memory as a view over the environment's shared message log.
+
+Instead of copying every published message into each role's own `Memory`,
+a view holds a read cursor into the environment memory (the arena) plus the
+few messages the role received that were never published. Every role reads
+the same message objects and arena indexes, so memory use grows with the
+number of messages rather than roles x messages.
+"""
+import heapq
+from itertools import islice
+from typing import Iterable, Optional, Type
+
+from autoagents.actions import Action
+from autoagents.system.schema import Message
+from .memory import Memory
+
+
+class MemoryView:
+    """The `Memory` read and receive API over the arena messages a role has received, plus its local ones."""
+
+    def __init__(self, arena: Memory):
+        self.arena = arena
+        self.floor = 0  # arena offsets below this were cleared from the view
+        self.cursor = 0  # arena offsets from here on have not been received yet
+        self.hidden: set[str] = set()  # ids of arena messages deleted from the view
+        self.local = Memory()  # received messages that were not in the arena
+        self.local_at: dict[str, int] = {}  # local message id -> cursor when it was received
+
+    def _in_view(self, message: Message) -> bool:
+        """Whether an arena message is visible; a local copy of it takes its place."""
+        offset = self.arena.offsets[message.id]
+        return (self.floor <= offset < self.cursor
+                and message.id not in self.hidden and message.id not in self.local_at)
+
+    def _key(self, message: Message) -> tuple:
+        # A local message sorts before the arena messages received after it
+        if message.id in self.local_at:
+            return self.local_at[message.id], 0, self.local.offsets[message.id]
+        return self.arena.offsets[message.id], 1, 0
+
+    def _merge(self, arena_messages: Iterable[Message], local_messages: Iterable[Message]) -> list[Message]:
+        visible = [m for m in arena_messages if self._in_view(m)]
+        if not self.local_at:
+            return visible
+        return list(heapq.merge(visible, local_messages, key=self._key))
+
+    @property
+    def storage(self) -> list[Message]:
+        return self._merge(self.arena.between(self.floor, self.cursor), self.local.storage)
+
+    @property
+    def index(self) -> dict[Type[Action], list[Message]]:
+        actions = set(self.arena.index) | set(self.local.index)
+        return {action: messages for action in actions if (messages := self.get_by_action(action))}
+
+    def _find_arena(self, message: Message) -> int:
+        """Return the offset of the visible arena message equal to `message`, -1 if absent"""
+        arena = self.arena
+        slot = arena.slots.get(message.id)
+        if slot is not None and arena.log[slot] is message and self._in_view(message):
+            return arena.offsets[message.id]
+        for message_id in arena.hashes.get(message.content_hash, ()):
+            candidate = arena.log[arena.slots[message_id]]
+            if self._in_view(candidate) and candidate == message:
+                return arena.offsets[message_id]
+        return -1
+
+    def _next_published(self) -> Optional[Message]:
+        """The first arena message at or after the cursor, skipping deleted ones"""
+        for message in islice(self.arena.log, self.arena.slot(self.cursor), None):
+            if message is not None:
+                return message
+        return None
+
+    def __contains__(self, message: Message) -> bool:
+        return message in self.local or self._find_arena(message) >= 0
+
+    def add(self, message: Message):
+        """Receive a message like `Memory.add`.
+
+        The next message of the arena log is received by moving the cursor past it;
+        any other message is kept locally, so the cursor never skips unreceived messages.
+        """
+        published = self._next_published() is message
+        if message in self:
+            if published:
+                # An equal message was received before: keep this copy out of the view but stay in step
+                self.hidden.add(message.id)
+                self.cursor = self.arena.offsets[message.id] + 1
+            return
+        if published:
+            self.cursor = self.arena.offsets[message.id] + 1
+            return
+        self.local.add(message)
+        self.local_at[message.id] = self.cursor
+
+    def add_batch(self, messages: Iterable[Message]):
+        for message in messages:
+            self.add(message)
+
+    def delete(self, message: Message):
+        """Delete the specified message from the view; the arena is left untouched"""
+        offset = self.local._find(message)
+        if offset >= 0:
+            stored = self.local.at(offset)
+            self.local.delete(stored)
+            del self.local_at[stored.id]
+            return
+        offset = self._find_arena(message)
+        if offset < 0:
+            raise ValueError(f"{message!r} is not in memory")
+        self.hidden.add(self.arena.at(offset).id)
+
+    def clear(self):
+        """Forget everything received so far"""
+        self.floor = self.cursor = max(self.cursor, self.arena.next_offset)
+        self.hidden = set()
+        self.local = Memory()
+        self.local_at = {}
+
+    def count(self) -> int:
+        return len(self.storage)
+
+    def get(self, k=0) -> list[Message]:
+        """Return the most recent k memories, return all when k=0"""
+        if not k:
+            return self.storage
+        # Walk back from the cursor only until k visible arena messages are found
+        start = self.arena.slot(self.floor)
+        i = self.arena.slot(self.cursor)
+        latest = []
+        while i > start and len(latest) < k:
+            i -= 1
+            message = self.arena.log[i]
+            if message is not None and self._in_view(message):
+                latest.append(message)
+        return self._merge(reversed(latest), self.local.storage)[-k:]
+
+    def since(self, cursor: int) -> tuple[list[Message], int]:
+        """Return the visible arena messages at or after offset `cursor`, and the cursor to read from next time.
+
+        Local messages never entered the arena's log and have no offset; `get` returns them.
+        """
+        messages = [m for m in self.arena.between(max(cursor, self.floor), self.cursor) if self._in_view(m)]
+        return messages, self.cursor
+
+    def remember(self, observed: list[Message], k=10) -> list[Message]:
+        """remember the most recent k memories from observed Messages, return all when k=0"""
+        already_observed = self.get(k)
+        seen = {m.content_hash for m in already_observed}
+        return [m for m in observed if not (m.content_hash in seen and m in already_observed)]
+
+    # Queries go to the arena, which may be indexed, and are filtered down to the view
+    def get_by_role(self, role: str) -> list[Message]:
+        """Return all messages of a specified role"""
+        return self._merge(self.arena.get_by_role(role), self.local.get_by_role(role))
+
+    def get_by_content(self, content: str) -> list[Message]:
+        """Return all messages containing a specified content"""
+        return self._merge(self.arena.get_by_content(content), self.local.get_by_content(content))
+
+    def try_remember(self, keyword: str) -> list[Message]:
+        """Try to recall all messages containing a specified keyword"""
+        return self._merge(self.arena.try_remember(keyword), self.local.try_remember(keyword))
+
+    def get_by_action(self, action: Type[Action]) -> list[Message]:
+        """Return all messages triggered by a specified Action"""
+        return self._merge(self.arena.index.get(action, {}).values(), self.local.index.get(action, {}).values())
+
+    def get_by_actions(self, actions: Iterable[Type[Action]]) -> list[Message]:
+        """Return all messages triggered by specified Actions"""
+        rsp = []
+        for action in actions:
+            rsp += self.get_by_action(action)
+        return rsp
+
+    def get_by_and_actions(self, actions: Iterable[Type[Action]]) -> list[Message]:
+        """Return all messages triggered by specified Actions, or none unless every Action has some"""
+        rsp = []
+        for action in actions:
+            messages = self.get_by_action(action)
+            if not messages:
+                return []
+            rsp += messages
+        return rsp
+
+
+if __name__ == '__main__':
+    import random
+
+    # A role's view must hold exactly what a private Memory fed the same calls would hold
+    class Publish(Action):
+        pass
+
+    mismatches = 0
+    for trial in range(400):
+        rng = random.Random(trial)
+        arena, plain = Memory(), Memory()
+        view = MemoryView(arena)
+        cursor = 0
+        for step in range(60):
+            op = rng.random()
+            # Few distinct contents, so equal copies with different ids are common
+            message = Message(rng.choice(["a b", "c", "d e f"]), role=rng.choice(["r1", "r2"]), cause_by=Publish)
+            if op < 0.35:
+                arena.add(message)
+            elif op < 0.45:
+                # The role acts: its message is kept, then published and observed again later
+                view.add(message)
+                plain.add(message)
+                arena.add(message)
+            elif op < 0.75:
+                published, cursor = arena.since(cursor)
+                for received in published:
+                    view.add(received)
+                    plain.add(received)
+            elif op < 0.85:
+                view.add(message)
+                plain.add(message)
+            elif op < 0.95 and plain.count():
+                victim = rng.choice(plain.storage)
+                view.delete(victim)
+                plain.delete(victim)
+            elif op < 0.97:
+                view.clear()
+                plain.clear()
+            k = rng.randint(0, 4)
+            if (view.storage != plain.storage or view.get(k) != plain.get(k) or view.count() != plain.count()
+                    or view.get_by_action(Publish) != plain.get_by_action(Publish)
+                    or view.get_by_role("r2") != plain.get_by_role("r2")):
+                mismatches += 1
+                break
+    print(f"MemoryView vs Memory: {mismatches} of 400 randomized trials diverged")
@@ -2,3 +2,5 @@
 # -*- coding: utf-8 -*-
 
 from .llm_api import LLMAPI
+from .cassette import CassetteLLMAPI, CassetteMissError
+from .registry import LLMRegistry, get_llm
@@ -3,7 +3,7 @@
 # From: https://github.com/geekan/MetaGPT/blob/main/metagpt/provider/base_gpt_api.py
 
 from abc import abstractmethod
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 from autoagents.system.logs import logger
 from autoagents.system.provider.base_chatbot import BaseChatbot
@@ -12,6 +12,8 @@ from autoagents.system.provider.base_chatbot import BaseChatbot
 class BaseGPTAPI(BaseChatbot):
     """GPT API abstract class, requiring all inheritors to provide a series of standard capabilities"""
     system_prompt = 'You are a helpful assistant.'
+    # Whether acompletion_json is available
+    structured_output = False
 
     def _user_msg(self, msg: str) -> dict[str, str]:
         return {"role": "user", "content": msg}
@@ -33,17 +35,31 @@ class BaseGPTAPI(BaseChatbot):
         rsp = self.completion(message)
         return self.get_choice_text(rsp)
 
-    async def aask(self, msg: str, system_msgs: Optional[list[str]] = None) -> str:
+    def _build_messages(self, msg: str, system_msgs: Optional[list[str]] = None) -> list[dict]:
         if system_msgs:
-            message = self._system_msgs(system_msgs) + [self._user_msg(msg)]
-        else:
-            message = [self._default_system_msg(), self._user_msg(msg)]
+            return self._system_msgs(system_msgs) + [self._user_msg(msg)]
+        return [self._default_system_msg(), self._user_msg(msg)]
 
+    async def aask(self, msg: str, system_msgs: Optional[list[str]] = None) -> str:
+        message = self._build_messages(msg, system_msgs)
         rsp = await self.acompletion_text(message, stream=True)
         logger.debug(message)
         # logger.debug(rsp)
         return rsp
 
+    async def aask_stream(self, msg: str, system_msgs: Optional[list[str]] = None) -> AsyncIterator[str]:
+        """Async-iterator version of aask, yielding reply deltas as they arrive"""
+        message = self._build_messages(msg, system_msgs)
+        logger.debug(message)
+        async for delta in self.acompletion_text_deltas(message):
+            yield delta
+
+    async def aask_json(self, msg: str, system_msgs: Optional[list[str]], schema: dict, name: str = "output") -> dict:
+        """Ask for a reply conforming to the JSON `schema` and return it parsed"""
+        message = self._build_messages(msg, system_msgs)
+        logger.debug(message)
+        return await self.acompletion_json(message, schema, name)
+
     def _extract_assistant_rsp(self, context):
         return "\n".join([i["content"] for i in context if i["role"] == "assistant"])
 
@@ -102,6 +118,19 @@ class BaseGPTAPI(BaseChatbot):
     async def acompletion_text(self, messages: list[dict], stream=False) -> str:
         """Asynchronous version of completion. Return str. Support stream-print"""
 
+    async def acompletion_text_stream(self, messages: list[dict]) -> AsyncIterator[str]:
+        """Yield the reply in deltas; providers without streaming yield it whole"""
+        yield await self.acompletion_text(messages)
+
+    async def acompletion_text_deltas(self, messages: list[dict]) -> AsyncIterator[str]:
+        """Yield the reply in deltas with the provider's retries; by default the plain stream"""
+        async for delta in self.acompletion_text_stream(messages):
+            yield delta
+
+    async def acompletion_json(self, messages: list[dict], schema: dict, name: str = "output") -> dict:
+        """Structured-output completion; providers without support raise NotImplementedError"""
+        raise NotImplementedError(f"{self.__class__.__name__} does not support structured output")
+
     def get_choice_text(self, rsp: dict) -> str:
         """Required to provide the first text of choice"""
         return rsp.get("choices")[0]["message"]["content"]
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Record/replay LLM provider for deterministic offline runs.
+
+In record mode every request/response pair of a real run is appended to a
+JSONL cassette. In replay mode the responses are served back from the
+cassette, matched on a hash of the whitespace-normalized prompt, optionally
+with the recorded latency, so full flows can be re-run without network.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import AsyncIterator
+
+import cfg
+from autoagents.system.const import DATA_PATH
+from autoagents.system.logs import logger
+from autoagents.system.provider.llm_api import LLMAPI
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Characters per delta when a recorded reply is streamed back
+_REPLAY_CHUNK = 64
+
+
+class CassetteMissError(KeyError):
+    """Raised in replay mode when the cassette has no response for a prompt."""
+    retryable = False
+
+
+def prompt_key(messages: list[dict]) -> str:
+    """Hash the prompt with whitespace collapsed, ignoring model and sampling params."""
+    normalized = [
+        [m.get("role"), " ".join(m["content"].split()) if isinstance(m.get("content"), str) else m.get("content")]
+        for m in messages
+    ]
+    raw = json.dumps(normalized, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Append-only JSONL store of recorded responses, replayed in recorded order per prompt."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: dict[str, list[dict]] = defaultdict(list)
+        self._cursor: dict[str, int] = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+
+    def load(self) -> "Cassette":
+        if not self.path.exists():
+            logger.warning(f"Cassette {self.path} does not exist; every request will miss")
+            return self
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+        logger.info(f"Loaded {sum(map(len, self._entries.values()))} responses from cassette {self.path}")
+        return self
+
+    def next(self, key: str) -> dict:
+        """Return the next recorded response for `key`; the last one repeats once exhausted."""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded response for prompt {key[:12]} in {self.path}")
+            idx = min(self._cursor[key], len(entries) - 1)
+            self._cursor[key] += 1
+            self.hits += 1
+            return entries[idx]
+
+    def append(self, entry: dict):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._entries[entry["key"]].append(entry)
+
+    def stats(self) -> dict:
+        return {"path": str(self.path), "prompts": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_CASSETTES: dict[str, Cassette] = {}
+_CASSETTES_LOCK = threading.Lock()
+
+
+def get_cassette(path=None, mode: str = None) -> Cassette:
+    """Return the process-wide cassette for `path`, loading it for replay."""
+    path = Path(path or cfg.LLM_CASSETTE_PATH or DATA_PATH / "llm_cassette.jsonl")
+    with _CASSETTES_LOCK:
+        cassette = _CASSETTES.get(str(path))
+        if cassette is None:
+            cassette = Cassette(path)
+            if (mode or cfg.LLM_CASSETTE_MODE) == REPLAY:
+                cassette.load()
+            _CASSETTES[str(path)] = cassette
+    return cassette
+
+
+class CassetteLLMAPI(LLMAPI):
+    """LLMAPI that records to, or replays from, a JSONL cassette."""
+
+    def __init__(self, proxy: str = "", api_key: str = "", model: str = None,
+                 mode: str = None, path=None, latency: float = None):
+        super().__init__(proxy=proxy, api_key=api_key, model=model)
+        self.mode = mode or cfg.LLM_CASSETTE_MODE
+        if self.mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {self.mode}")
+        self.latency = cfg.LLM_CASSETTE_LATENCY if latency is None else latency
+        self.cassette = get_cassette(path, self.mode)
+
+    def _record(self, messages: list[dict], content: str, usage: dict, ttft: float, duration: float):
+        self.cassette.append({
+            "key": prompt_key(messages),
+            "model": self.model,
+            "content": content,
+            "usage": {k: int(v) for k, v in (usage or {}).items()},
+            "ttft": round(ttft, 4),
+            "duration": round(duration, 4),
+        })
+
+    async def _replay(self, messages: list[dict]) -> AsyncIterator[str]:
+        entry = self.cassette.next(prompt_key(messages))
+        self.request_count += 1
+        content = entry["content"]
+        if not self.latency:
+            yield content
+            return
+        chunks = [content[i:i + _REPLAY_CHUNK] for i in range(0, len(content), _REPLAY_CHUNK)] or [""]
+        await asyncio.sleep(entry.get("ttft", 0) * self.latency)
+        gap = max(0.0, entry.get("duration", 0) - entry.get("ttft", 0)) * self.latency / len(chunks)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(gap)
+            yield chunk
+
+    async def acompletion_text_stream(self, messages: list[dict]) -> AsyncIterator[str]:
+        if self.mode == REPLAY:
+            async for delta in self._replay(messages):
+                yield delta
+            return
+
+        start = time.monotonic()
+        ttft = None
+        collected = []
+        failed = False
+        stream = super().acompletion_text_stream(messages)
+        try:
+            async for delta in stream:
+                if ttft is None:
+                    ttft = time.monotonic() - start
+                collected.append(delta)
+                yield delta
+        except GeneratorExit:
+            raise
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await stream.aclose()
+            if not failed:
+                # A consumer that stopped early (all sections received) replays the text it read
+                text = "".join(collected)
+                duration = time.monotonic() - start
+                self._record(messages, text, self._calc_usage(messages, text), ttft or duration, duration)
+
+    async def _achat_completion(self, messages: list[dict], **extra) -> dict:
+        if self.mode == REPLAY:
+            content = "".join([delta async for delta in self._replay(messages)])
+            return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+        start = time.monotonic()
+        rsp = await super()._achat_completion(messages, **extra)
+        duration = time.monotonic() - start
+        content = rsp.get("choices", [{}])[0].get("message", {}).get("content", "") or ""
+        self._record(messages, content, self._calc_usage(messages, content), duration, duration)
+        return rsp
+
+    def _chat_completion(self, messages: list[dict]) -> dict:
+        if self.mode == REPLAY:
+            entry = self.cassette.next(prompt_key(messages))
+            self.request_count += 1
+            return {"choices": [{"message": {"role": "assistant", "content": entry["content"]}}]}
+
+        start = time.monotonic()
+        rsp = super()._chat_completion(messages)
+        duration = time.monotonic() - start
+        content = rsp.get("choices", [{}])[0].get("message", {}).get("content", "") or ""
+        self._record(messages, content, self._calc_usage(messages, content), duration, duration)
+        return rsp
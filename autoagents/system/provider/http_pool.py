@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Pooled async HTTP transport shared by all LLM clients.
+
+A single keep-alive `httpx.AsyncClient` per proxy lets sequential calls reuse
+open connections instead of paying a TLS handshake every time. It reaches
+LiteLLM per call, as the transport of an OpenAI client passed in `client=`,
+so concurrent calls with different keys or proxies never share module globals.
+"""
+import asyncio
+import threading
+import weakref
+
+import httpx
+
+import cfg
+
+try:
+    from openai import AsyncOpenAI
+except ImportError:  # openai<1 has no client objects; LiteLLM then uses its own transport
+    AsyncOpenAI = None
+
+# Connections are bound to the loop that opened them: event loop -> proxy -> client.
+# Weak keys drop a loop's clients with the loop, so a new loop never inherits them by a reused id
+_SESSIONS: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+# event loop -> (proxy, api key, api base) -> (pooled session, OpenAI client over it)
+_OPENAI_CLIENTS: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_SESSIONS_LOCK = threading.Lock()
+
+
+def _new_session(proxy: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=cfg.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=cfg.LLM_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=cfg.LLM_HTTP_KEEPALIVE_EXPIRY,
+    )
+    kwargs = {"limits": limits, "timeout": cfg.LLM_TIMEOUT}
+    if not proxy:
+        return httpx.AsyncClient(**kwargs)
+    try:
+        return httpx.AsyncClient(proxy=proxy, **kwargs)
+    except TypeError:
+        # httpx < 0.26 only knows the plural argument
+        return httpx.AsyncClient(proxies=proxy, **kwargs)
+
+
+def get_async_session(proxy: str = "") -> httpx.AsyncClient:
+    """Return the pooled client for `proxy` on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _SESSIONS_LOCK:
+        # Clients of closed loops can never be used again; drop them
+        for closed in [other for other in _SESSIONS if other.is_closed()]:
+            del _SESSIONS[closed]
+        sessions = _SESSIONS.setdefault(loop, {})
+        session = sessions.get(proxy or "")
+        if session is None or session.is_closed:
+            session = _new_session(proxy)
+            sessions[proxy or ""] = session
+    return session
+
+
+def get_openai_client(proxy: str = "", api_key: str = "", api_base: str = ""):
+    """Return an OpenAI client over the pooled session for `proxy`, or None without openai>=1."""
+    if AsyncOpenAI is None:
+        return None
+    session = get_async_session(proxy)
+    key = (proxy or "", api_key or "", api_base or "")
+    with _SESSIONS_LOCK:
+        clients = _OPENAI_CLIENTS.setdefault(asyncio.get_running_loop(), {})
+        cached = clients.get(key)
+        if cached is not None and cached[0] is session:
+            return cached[1]
+        # First use, or the pooled session was replaced after being closed
+        client = AsyncOpenAI(api_key=api_key or None, base_url=api_base or None, http_client=session)
+        clients[key] = (session, client)
+    return client
+
+
+async def aclose_sessions():
+    """Close every pooled client owned by the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _SESSIONS_LOCK:
+        sessions = _SESSIONS.pop(loop, {})
+        _OPENAI_CLIENTS.pop(loop, None)
+    for session in sessions.values():
+        await session.aclose()
+
+
+def pool_stats() -> list[dict]:
+    stats = []
+    with _SESSIONS_LOCK:
+        items = [item for sessions in _SESSIONS.values() for item in sessions.items()]
+    for proxy, session in items:
+        # httpcore exposes the live connections on the transport's pool
+        pool = getattr(getattr(session, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None) or []
+        stats.append({
+            "proxy": proxy or None,
+            "closed": session.is_closed,
+            "connections": len(connections),
+            "idle_connections": sum(1 for c in connections if getattr(c, "is_idle", lambda: False)()),
+        })
+    return stats
@@ -7,15 +7,24 @@ Replaces separate OpenAI/Anthropic provider variants and ensures
 unsupported parameters are safely dropped for each model.
 """
 import asyncio
-import time
+import json
+import re
+import weakref
 from functools import wraps
-from typing import NamedTuple
+from typing import AsyncIterator, NamedTuple
 
 import litellm
 
 import cfg
+from autoagents.system.const import DATA_PATH
 from autoagents.system.logs import logger
 from autoagents.system.provider.base_gpt_api import BaseGPTAPI
+from autoagents.system.provider.http_pool import get_openai_client
+from autoagents.system.provider.llm_cache import LLMResponseCache, make_cache_key
+from autoagents.system.provider.rate_limiter import get_limiter, is_rate_limit_error, response_headers, retry_after_seconds
+from autoagents.system.provider.router import HedgedRouter
+from autoagents.system.provider.stream import emit_delta
+from autoagents.system.utils.async_pool import bounded_as_completed
 from autoagents.system.utils.singleton import Singleton
 from autoagents.system.utils.token_counter import (
     TOKEN_COSTS,
@@ -31,35 +40,84 @@ def retry(max_retries):
             for i in range(max_retries):
                 try:
                     return await f(*args, **kwargs)
-                except Exception:
-                    if i == max_retries - 1:
+                except Exception as e:
+                    if i == max_retries - 1 or not getattr(e, "retryable", True):
                         raise
-                    await asyncio.sleep(2 ** i)
+                    await _back_off(args[0] if args else None, e, i)
         return wrapper
     return decorator
 
 
-class RateLimiter:
-    """Simple RPM-based rate limiter."""
+async def _back_off(llm, e: Exception, attempt: int):
+    """Wait before retrying a failed request of `llm`."""
+    limiter = getattr(llm, "limiter", None)
+    if limiter is not None and is_rate_limit_error(e):
+        # The shared limiter queues the next attempt behind the provider's cool-down
+        limiter.penalize(retry_after_seconds(e))
+        return
+    await asyncio.sleep(2 ** attempt)
+
+
+_LITELLM_CONFIGURED = False
+
+
+def configure_litellm():
+    """Apply LiteLLM's process-global settings once."""
+    global _LITELLM_CONFIGURED
+    if _LITELLM_CONFIGURED:
+        return
+    # Ensure LiteLLM drops unsupported params automatically
+    litellm.drop_params = True
+    # Configure bases/types/versions where applicable (e.g., Azure)
+    if cfg.OPENAI_API_BASE:
+        litellm.api_base = cfg.OPENAI_API_BASE
+    if cfg.OPENAI_API_TYPE:
+        litellm.api_type = cfg.OPENAI_API_TYPE
+    if cfg.OPENAI_API_VERSION:
+        litellm.api_version = cfg.OPENAI_API_VERSION
+    _LITELLM_CONFIGURED = True
+
+
+_RESPONSE_CACHE = None
+
+# In-flight requests shared by identical concurrent callers: event loop -> (kind, request hash) -> future.
+# Weak keys drop a loop's entries with the loop, so a new loop never inherits them by a reused id
+_INFLIGHT: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_response_cache():
+    """Return the process-wide response cache, or None when caching is disabled."""
+    global _RESPONSE_CACHE
+    if not cfg.LLM_CACHE:
+        return None
+    if _RESPONSE_CACHE is None:
+        path = cfg.LLM_CACHE_PATH or DATA_PATH / "llm_cache.sqlite3"
+        _RESPONSE_CACHE = LLMResponseCache(path, max_bytes=cfg.LLM_CACHE_MAX_BYTES, ttl=cfg.LLM_CACHE_TTL)
+    return _RESPONSE_CACHE
 
-    def __init__(self, rpm):
-        self.last_call_time = 0
-        self.interval = 1.1 * 60 / rpm
-        self.rpm = rpm
 
-    def split_batches(self, batch):
-        return [batch[i:i + self.rpm] for i in range(0, len(batch), self.rpm)]
+# Providers that only reuse a cached prompt prefix when it carries explicit cache-control markers
+_CACHE_CONTROL_PROVIDERS = {"anthropic", "bedrock", "vertex_ai"}
 
-    async def wait_if_needed(self, num_requests):
-        current_time = time.time()
-        elapsed_time = current_time - self.last_call_time
 
-        if elapsed_time < self.interval * num_requests:
-            remaining_time = self.interval * num_requests - elapsed_time
-            logger.info(f"sleep {remaining_time}")
-            await asyncio.sleep(remaining_time)
+def _usage_field(obj, name: str):
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
 
-        self.last_call_time = time.time()
+
+def cached_prompt_tokens(usage) -> int:
+    """Read the number of prompt tokens served from the provider's prefix cache."""
+    details = _usage_field(usage, "prompt_tokens_details")
+    cached = _usage_field(details, "cached_tokens")
+    if cached is None:
+        cached = _usage_field(usage, "cache_read_input_tokens")
+    try:
+        return int(cached or 0)
+    except (TypeError, ValueError):
+        return 0
 
 
 class Costs(NamedTuple):
@@ -67,6 +125,8 @@ class Costs(NamedTuple):
     total_completion_tokens: int
     total_cost: float
     total_budget: float
+    total_cached_tokens: int = 0
+    total_requests: int = 0
 
 
 class CostManager(metaclass=Singleton):
@@ -75,12 +135,16 @@ class CostManager(metaclass=Singleton):
     def __init__(self):
         self.total_prompt_tokens = 0
         self.total_completion_tokens = 0
+        self.total_cached_tokens = 0
+        self.total_requests = 0
         self.total_cost = 0
         self.total_budget = float(getattr(cfg, "MAX_BUDGET", 0.0) or 0.0)
 
-    def update_cost(self, prompt_tokens, completion_tokens, model):
+    def update_cost(self, prompt_tokens, completion_tokens, model, cached_tokens=0):
         self.total_prompt_tokens += prompt_tokens
         self.total_completion_tokens += completion_tokens
+        self.total_cached_tokens += cached_tokens
+        self.total_requests += 1
         # Prefer litellm dynamic pricing; fallback to static TOKEN_COSTS
         try:
             prompt_cost, completion_cost = litellm.cost_per_token(
@@ -100,41 +164,87 @@ class CostManager(metaclass=Singleton):
         self.total_cost += cost
         logger.info(
             f"Total running cost: ${self.total_cost:.3f} | Max budget: ${cfg.MAX_BUDGET:.3f} | "
+            f"Requests: {self.total_requests} | "
             f"Current cost: ${cost:.3f}, {prompt_tokens=}, {completion_tokens=}"
+            + (f", {cached_tokens=} (total {self.total_cached_tokens})" if cached_tokens else "")
         )
         cfg.TOTAL_COST = self.total_cost
 
     def get_costs(self) -> Costs:
-        return Costs(self.total_prompt_tokens, self.total_completion_tokens, self.total_cost, self.total_budget)
+        return Costs(self.total_prompt_tokens, self.total_completion_tokens, self.total_cost, self.total_budget,
+                     self.total_cached_tokens, self.total_requests)
 
 
-class LLMAPI(BaseGPTAPI, RateLimiter):
+class LLMAPI(BaseGPTAPI):
     """Unified LLM provider using LiteLLM for routing."""
+    structured_output = True
 
-    def __init__(self, proxy: str = "", api_key: str = ""):
+    def __init__(self, proxy: str = "", api_key: str = "", model: str = None):
         self.proxy = proxy
         self.api_key = api_key
         self.stops = cfg.STOP
-        self.model = cfg.LLM_MODEL
-        # Ensure LiteLLM drops unsupported params automatically
-        litellm.drop_params = True
-        # Configure bases/types/versions where applicable (e.g., Azure)
-        if cfg.OPENAI_API_BASE:
-            litellm.api_base = cfg.OPENAI_API_BASE
-        if cfg.OPENAI_API_TYPE:
-            litellm.api_type = cfg.OPENAI_API_TYPE
-        if cfg.OPENAI_API_VERSION:
-            litellm.api_version = cfg.OPENAI_API_VERSION
+        self.model = model or cfg.LLM_MODEL
+        self.request_count = 0
+        self.coalesced_count = 0
+        configure_litellm()
 
         self._cost_manager = CostManager()
         self.rpm = int(cfg.RPM)
-        RateLimiter.__init__(self, rpm=self.rpm)
+        self.limiter = self._limiter_for(self.model)
+        self.router = HedgedRouter(self, [self.model] + cfg.LLM_FALLBACK_MODELS) if cfg.LLM_FALLBACK_MODELS else None
 
-    def _select_api_key(self) -> str:
+    def _provider_name(self, model: str = None) -> str:
+        if cfg.OPENAI_API_TYPE == "azure":
+            return "azure"
+        m = model or self.model or ""
+        if "/" in m:
+            return m.split("/", 1)[0]
+        if "claude" in m.lower():
+            return "anthropic"
+        return "openai"
+
+    def _limiter_for(self, model: str):
+        return get_limiter(self._provider_name(model), model, self._select_api_key(model), rpm=self.rpm, tpm=cfg.TPM)
+
+    def _prepare_async_call(self, model: str = None) -> dict:
+        """Count the request and return its credentials and pooled transport as call kwargs.
+
+        Nothing is written to LiteLLM's module globals, which concurrent calls to other
+        providers or through other proxies would overwrite before the request is sent.
+        """
+        self.request_count += 1
+        api_key = self._select_api_key(model)
+        call = {"api_key": api_key} if api_key else {}
+        if cfg.OPENAI_API_TYPE != "azure" and self._provider_name(model) == "openai":
+            client = get_openai_client(self.proxy, api_key, cfg.OPENAI_API_BASE)
+            if client is not None:
+                call["client"] = client
+        return call
+
+    async def _acquire(self, messages: list[dict], model: str = None) -> int:
+        """Wait for the shared RPM/TPM budget; return the estimated token count."""
+        model = model or self.model
+        # A character-based estimate is enough for budgeting; real usage is reconciled afterwards
+        estimated = count_message_tokens(messages, model, approximate=True) + int(cfg.MAX_TOKENS or 0)
+        await self._limiter_for(model).acquire(estimated)
+        return estimated
+
+    def _reconcile(self, estimated: int, usage: dict, model: str = None):
+        actual = int(usage["prompt_tokens"]) + int(usage["completion_tokens"])
+        self._limiter_for(model or self.model).reconcile(estimated, actual)
+
+    def _observe_rate_limits(self, response, model: str = None):
+        """Feed the provider's rate-limit headers back into the shared limiter."""
+        try:
+            self._limiter_for(model or self.model).observe_headers(response_headers(response))
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable rate-limit headers: {e}")
+
+    def _select_api_key(self, model: str = None) -> str:
         """Pick API key based on model family if possible."""
         if self.api_key:
             return self.api_key
-        m = (self.model or "").lower()
+        m = (model or self.model or "").lower()
         if "anthropic" in m or "claude" in m:
             return cfg.CLAUDE_API_KEY or cfg.LLM_API_KEY
         return cfg.LLM_API_KEY
@@ -157,84 +267,319 @@ class LLMAPI(BaseGPTAPI, RateLimiter):
             base.update({"deployment_id": cfg.DEPLOYMENT_ID})
         else:
             base.update({"model": self.model})
+        if cfg.LLM_PROMPT_CACHE and self._provider_name() in _CACHE_CONTROL_PROVIDERS:
+            base["messages"] = self._mark_cacheable_prefix(messages)
         return base
 
-    async def _achat_completion_stream(self, messages: list[dict]) -> str:
-        # Configure key per-call to support multiple providers
-        litellm.api_key = self._select_api_key()
+    @staticmethod
+    def _mark_cacheable_prefix(messages: list[dict]) -> list[dict]:
+        """Put a cache-control breakpoint on the last system message, leaving `messages` untouched."""
+        last = max((i for i, m in enumerate(messages) if m["role"] == "system"), default=None)
+        if last is None or not isinstance(messages[last]["content"], str):
+            return messages
+        marked = list(messages)
+        marked[last] = {
+            "role": "system",
+            "content": [{"type": "text", "text": messages[last]["content"], "cache_control": {"type": "ephemeral"}}],
+        }
+        return marked
+
+    async def _cache_get(self, kwargs: dict):
+        cache = get_response_cache()
+        if cache is None:
+            return None, None
+        key = make_cache_key(kwargs)
+        try:
+            return key, await asyncio.to_thread(cache.get, key)
+        except Exception as e:
+            # The cache is an optimization; never fail a request because of it
+            logger.warning(f"LLM cache lookup failed: {e}")
+            return key, None
+
+    async def _cache_set(self, key, text: str, usage: dict):
+        cache = get_response_cache()
+        if cache is None or key is None:
+            return
+        try:
+            await asyncio.to_thread(cache.set, key, {"content": text, "usage": dict(usage)})
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    async def _astream(self, messages: list[dict], kwargs: dict, usage_out: dict = None,
+                       on_acquired=None) -> AsyncIterator[str]:
+        """Yield content deltas straight from the provider and bill the streamed reply.
+
+        The billed usage is written into `usage_out` when given. `on_acquired` is called
+        once the rate limiter lets the request through, just before it is sent.
+        """
+        model = kwargs.get("model") or self.model
+        estimated = await self._acquire(messages, model)
+        if on_acquired is not None:
+            on_acquired()
+        # Pass key and pooled transport per call to support multiple providers
+        extra = self._prepare_async_call(model)
+        if cfg.LLM_PROMPT_CACHE:
+            extra["stream_options"] = {"include_usage": True}
         response = await litellm.acompletion(
-            **self._cons_kwargs(messages),
+            **kwargs,
+            **extra,
             stream=True,
         )
+        self._observe_rate_limits(response, model)
 
-        collected_messages = []
-        async for chunk in response:
-            chunk_message = chunk["choices"][0]["delta"]
-            collected_messages.append(chunk_message)
-            content = chunk_message.get("content")
-            if isinstance(content, str) and content:
-                print(content, end="")
-
-        # Some streaming deltas may include content=None; coerce to empty string
-        full_reply_content = "".join([(m.get("content") or "") for m in collected_messages])
-        usage = self._calc_usage(messages, full_reply_content)
-        self._update_costs(usage)
-        return full_reply_content
+        collected, reported = [], None
+        try:
+            async for chunk in response:
+                # The usage-only chunk closing the stream carries no choices
+                reported = _usage_field(chunk, "usage") or reported
+                choices = chunk["choices"]
+                if not choices:
+                    continue
+                # Some streaming deltas may include content=None
+                content = choices[0]["delta"].get("content")
+                if isinstance(content, str) and content:
+                    collected.append(content)
+                    yield content
+        finally:
+            # Close the provider stream if the consumer stopped early
+            aclose = getattr(response, "aclose", None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception:
+                    pass
+            usage = self._calc_usage(messages, "".join(collected), model)
+            if reported is not None:
+                usage = self._normalize_usage(reported, usage)
+            self._update_costs(usage, model)
+            self._reconcile(estimated, usage, model)
+            if usage_out is not None:
+                usage_out.update(usage)
+
+    async def acompletion_text_stream(self, messages: list[dict]) -> AsyncIterator[str]:
+        """Asynchronously iterate over the reply deltas as the provider produces them."""
+        kwargs = self._cons_kwargs(messages)
+        cache_key, cached = await self._cache_get(kwargs)
+        if cached is not None:
+            logger.debug(f"LLM cache hit {cache_key[:12]}")
+            yield cached["content"]
+            return
+
+        collected, usage = [], {}
+        stream = self.router.stream(messages, kwargs, usage) if self.router else self._astream(messages, kwargs, usage)
+        async for delta in stream:
+            collected.append(delta)
+            yield delta
+        await self._cache_set(cache_key, "".join(collected), usage)
 
-    async def _achat_completion(self, messages: list[dict]) -> dict:
-        litellm.api_key = self._select_api_key()
-        rsp = await litellm.acompletion(**self._cons_kwargs(messages))
+    async def _achat_completion_stream(self, messages: list[dict]) -> str:
+        collected = []
+        async for delta in self.acompletion_text_stream(messages):
+            emit_delta(delta)
+            collected.append(delta)
+        return "".join(collected)
+
+    async def _achat_completion(self, messages: list[dict], **extra) -> dict:
+        kwargs = self._cons_kwargs(messages)
+        kwargs.update(extra)
+        cache_key, cached = await self._cache_get(kwargs)
+        if cached is not None:
+            logger.debug(f"LLM cache hit {cache_key[:12]}")
+            return {
+                "choices": [{"message": {"role": "assistant", "content": cached["content"]}}],
+                "usage": cached["usage"],
+            }
+
+        estimated = await self._acquire(messages)
+        rsp = await litellm.acompletion(**kwargs, **self._prepare_async_call())
+        self._observe_rate_limits(rsp)
+        content = rsp.get("choices", [{}])[0].get("message", {}).get("content", "")
         usage = rsp.get("usage")
-        if usage is None:
-            usage = self._calc_usage(messages, rsp.get("choices", [{}])[0].get("message", {}).get("content", ""))
+        usage = self._normalize_usage(usage, None) if usage is not None else self._calc_usage(messages, content)
         self._update_costs(usage)
+        self._reconcile(estimated, usage)
+        await self._cache_set(cache_key, content or "", usage)
         return rsp
 
+    async def acompletion_json(self, messages: list[dict], schema: dict, name: str = "output") -> dict:
+        """Request provider-enforced JSON output (a tool call on providers without json_schema)."""
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {"name": re.sub(r"[^a-zA-Z0-9_-]", "_", name), "schema": schema, "strict": True},
+        }
+        return json.loads(await self._acompletion_formatted(messages, response_format))
+
+    @retry(max_retries=6)
+    async def _acompletion_formatted(self, messages: list[dict], response_format: dict) -> str:
+        """Reply text of a `response_format` request, with the retries and request sharing of `acompletion_text`."""
+        key = make_cache_key({**self._cons_kwargs(messages), "response_format": response_format})
+        try:
+            rsp, _ = await self._single_flight(
+                ("formatted", key), lambda: self._achat_completion(messages, response_format=response_format))
+        except Exception as e:
+            if getattr(e, "status_code", None) == 400:
+                # A rejected request, e.g. an unsupported response_format, fails the same way again
+                e.retryable = False
+            raise
+        return self.get_choice_text(rsp)
+
     def _chat_completion(self, messages: list[dict]) -> dict:
-        litellm.api_key = self._select_api_key()
-        rsp = litellm.completion(**self._cons_kwargs(messages))
+        api_key = self._select_api_key()
+        rsp = litellm.completion(**self._cons_kwargs(messages), **({"api_key": api_key} if api_key else {}))
         usage = rsp.get("usage")
         if usage is None:
             usage = self._calc_usage(messages, rsp.get("choices", [{}])[0].get("message", {}).get("content", ""))
+        else:
+            usage = self._normalize_usage(usage)
         self._update_costs(usage)
         return rsp
 
     def completion(self, messages: list[dict]) -> dict:
         return self._chat_completion(messages)
 
+    @staticmethod
+    def _inflight() -> dict[tuple, asyncio.Future]:
+        """Return the in-flight requests of the running event loop."""
+        return _INFLIGHT.setdefault(asyncio.get_running_loop(), {})
+
+    async def _single_flight(self, key: tuple, factory):
+        """Run `factory()` once for all concurrent callers with the same key.
+
+        Returns the shared result and whether it came from another caller's request.
+        """
+        if not cfg.LLM_SINGLE_FLIGHT:
+            return await factory(), False
+        inflight = self._inflight()
+        task = inflight.get(key)
+        if task is not None:
+            self.coalesced_count += 1
+            logger.debug(f"Joined in-flight LLM request {key[-1][:12]}")
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(factory())
+        inflight[key] = task
+
+        def _done(t):
+            if inflight.get(key) is t:
+                del inflight[key]
+            if not t.cancelled():
+                t.exception()  # mark retrieved even if every waiter went away
+
+        task.add_done_callback(_done)
+        # Shield so a cancelled caller does not cancel the request for the others
+        return await asyncio.shield(task), False
+
     async def acompletion(self, messages: list[dict]) -> dict:
-        return await self._achat_completion(messages)
+        key = make_cache_key(self._cons_kwargs(messages))
+        rsp, _ = await self._single_flight(("chat", key), lambda: self._achat_completion(messages))
+        return rsp
 
     @retry(max_retries=6)
     async def acompletion_text(self, messages: list[dict], stream: bool = False) -> str:
         if stream:
-            return await self._achat_completion_stream(messages)
-        rsp = await self._achat_completion(messages)
+            key = make_cache_key(self._cons_kwargs(messages))
+            text, shared = await self._single_flight(("stream", key), lambda: self._achat_completion_stream(messages))
+            if shared:
+                # The leader streamed to its own sink; hand the joined caller the whole reply
+                emit_delta(text)
+            return text
+        rsp = await self.acompletion(messages)
         try:
             return self.get_choice_text(rsp)
         except Exception:
             # Fallback to empty string for rare provider anomalies
             return rsp.get("choices", [{}])[0].get("message", {}).get("content", "") or ""
 
-    def _calc_usage(self, messages: list[dict], rsp: str) -> dict:
-        prompt_tokens = count_message_tokens(messages, self.model)
-        completion_tokens = count_string_tokens(rsp, self.model)
+    async def acompletion_text_deltas(self, messages: list[dict], max_retries: int = 6) -> AsyncIterator[str]:
+        """Yield the reply deltas with the retries and request sharing of `acompletion_text`.
+
+        A failure before the first delta is retried like `acompletion_text`, behind the
+        limiter's cool-down on a 429; once a delta was yielded the error propagates.
+        A caller that stops early shares the text it read with the callers it joined.
+        """
+        key = ("stream", make_cache_key(self._cons_kwargs(messages)))
+        flight = None
+        if cfg.LLM_SINGLE_FLIGHT:
+            inflight = self._inflight()
+            task = inflight.get(key)
+            if task is not None:
+                self.coalesced_count += 1
+                logger.debug(f"Joined in-flight LLM request {key[-1][:12]}")
+                yield await asyncio.shield(task)
+                return
+            flight = asyncio.get_running_loop().create_future()
+            inflight[key] = flight
+
+        collected = []
+        try:
+            for i in range(max_retries):
+                stream = self.acompletion_text_stream(messages)
+                try:
+                    async for delta in stream:
+                        collected.append(delta)
+                        yield delta
+                    break
+                except Exception as e:
+                    if collected or i == max_retries - 1 or not getattr(e, "retryable", True):
+                        raise
+                    await _back_off(self, e, i)
+                finally:
+                    await stream.aclose()
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            if flight is not None and not flight.done():
+                if isinstance(e, Exception):
+                    flight.set_exception(e)
+                    flight.exception()  # mark retrieved even if no caller joined
+                else:
+                    flight.cancel()
+            raise
+        finally:
+            if flight is not None:
+                if inflight.get(key) is flight:
+                    del inflight[key]
+                if not flight.done():
+                    flight.set_result("".join(collected))
+
+    @staticmethod
+    def _normalize_usage(reported, fallback: dict = None) -> dict:
+        """Convert provider usage into a plain dict, filling gaps from `fallback`."""
+        fallback = fallback or {}
+        usage = {
+            "prompt_tokens": _usage_field(reported, "prompt_tokens") or fallback.get("prompt_tokens", 0),
+            "completion_tokens": _usage_field(reported, "completion_tokens") or fallback.get("completion_tokens", 0),
+        }
+        cached = cached_prompt_tokens(reported)
+        if cached:
+            usage["cached_tokens"] = cached
+        return usage
+
+    def _calc_usage(self, messages: list[dict], rsp: str, model: str = None) -> dict:
+        model = model or self.model
+        prompt_tokens = count_message_tokens(messages, model)
+        completion_tokens = count_string_tokens(rsp, model)
         return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
 
-    async def acompletion_batch(self, batch: list[list[dict]]) -> list[dict]:
-        split_batches = self.split_batches(batch)
-        all_results = []
-        for small_batch in split_batches:
-            logger.info(small_batch)
-            await self.wait_if_needed(len(small_batch))
-            future = [self.acompletion(prompt) for prompt in small_batch]
-            results = await asyncio.gather(*future)
-            logger.info(results)
-            all_results.extend(results)
+    async def acompletion_batch_iter(self, batch: list[list[dict]], concurrency: int = None,
+                                     timeout: float = None, return_exceptions: bool = False):
+        """Yield (index, response) pairs as requests finish, keeping `concurrency` requests in flight."""
+        concurrency = concurrency or cfg.LLM_MAX_CONCURRENCY
+        async for idx, rsp in bounded_as_completed(self.acompletion, batch, concurrency,
+                                                   timeout=timeout, return_exceptions=return_exceptions):
+            yield idx, rsp
+
+    async def acompletion_batch(self, batch: list[list[dict]], concurrency: int = None,
+                                timeout: float = None) -> list[dict]:
+        all_results = [None] * len(batch)
+        async for idx, rsp in self.acompletion_batch_iter(batch, concurrency, timeout):
+            logger.debug(f"Batch request {idx} finished")
+            all_results[idx] = rsp
         return all_results
 
-    async def acompletion_batch_text(self, batch: list[list[dict]]) -> list[str]:
-        raw_results = await self.acompletion_batch(batch)
+    async def acompletion_batch_text(self, batch: list[list[dict]], concurrency: int = None,
+                                     timeout: float = None) -> list[str]:
+        raw_results = await self.acompletion_batch(batch, concurrency, timeout)
         results = []
         for idx, raw_result in enumerate(raw_results, start=1):
             result = self.get_choice_text(raw_result)
@@ -242,10 +587,11 @@ class LLMAPI(BaseGPTAPI, RateLimiter):
             logger.info(f"Result of task {idx}: {result}")
         return results
 
-    def _update_costs(self, usage: dict):
+    def _update_costs(self, usage: dict, model: str = None):
         prompt_tokens = int(usage["prompt_tokens"])
         completion_tokens = int(usage["completion_tokens"])
-        self._cost_manager.update_cost(prompt_tokens, completion_tokens, self.model)
+        cached_tokens = int(usage.get("cached_tokens", 0) or 0)
+        self._cost_manager.update_cost(prompt_tokens, completion_tokens, model or self.model, cached_tokens)
 
     def get_costs(self) -> Costs:
         return self._cost_manager.get_costs()
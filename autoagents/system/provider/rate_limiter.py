@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Process-wide asyncio token-bucket limiter with RPM and TPM budgets.
+
+One limiter is shared per (provider, model, api key), no matter how many
+LLMAPI instances are created. Callers are admitted in FIFO order and wait
+for capacity up front instead of bursting into 429 responses. The buckets are
+kept in sync with the provider's rate-limit response headers, and the time
+spent waiting can be collected per block of work with `track_rate_limit_wait`.
+"""
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from autoagents.system.logs import logger
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class RateLimitWait:
+    """Seconds spent waiting on rate limits inside a `track_rate_limit_wait` block."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+
+_wait_tracker: ContextVar[Optional[RateLimitWait]] = ContextVar("rate_limit_wait", default=None)
+
+
+@contextmanager
+def track_rate_limit_wait():
+    """Collect the rate-limit waits of every request made in the block, including tasks it starts."""
+    tracker = RateLimitWait()
+    token = _wait_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _wait_tracker.reset(token)
+
+
+def _parse_reset(value) -> Optional[float]:
+    """Seconds until a window resets, from "1s", "6m0s", "20ms", plain seconds or an RFC 3339 timestamp."""
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    if "T" in value:
+        try:
+            reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+        except ValueError:
+            return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+
+
+def _header(headers: dict, *names):
+    for name in names:
+        if headers.get(name) is not None:
+            return headers[name]
+    return None
+
+
+class TokenBucketLimiter:
+    """Fair token bucket enforcing requests-per-minute and tokens-per-minute."""
+
+    def __init__(self, rpm: int, tpm: int = 0):
+        self.rpm = max(1, int(rpm))
+        self.tpm = max(0, int(tpm or 0))
+        self._requests = float(self.rpm)
+        self._tokens = float(self.tpm)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop = None
+        self.total_requests = 0
+        self.total_wait = 0.0
+        self.total_header_pauses = 0
+
+    def _get_lock(self) -> asyncio.Lock:
+        # asyncio.Lock is FIFO-fair, but bound to a single event loop
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _delay(self, tokens: int, now: float) -> float:
+        self._refill(now)
+        delay = max(0.0, self._blocked_until - now)
+        if self._requests < 1:
+            delay = max(delay, (1 - self._requests) * 60 / self.rpm)
+        if self.tpm:
+            need = min(tokens, self.tpm)
+            if self._tokens < need:
+                delay = max(delay, (need - self._tokens) * 60 / self.tpm)
+        return delay
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Wait until one request of `tokens` estimated tokens fits the budget; return seconds waited."""
+        waited = 0.0
+        async with self._get_lock():
+            while True:
+                delay = self._delay(tokens, time.monotonic())
+                if delay <= 0:
+                    break
+                logger.info(f"Rate limit reached, sleep {delay:.2f}s")
+                await asyncio.sleep(delay)
+                waited += delay
+            self._requests -= 1
+            if self.tpm:
+                self._tokens -= min(tokens, self.tpm)
+            self.total_requests += 1
+            self.total_wait += waited
+        tracker = _wait_tracker.get()
+        if tracker is not None:
+            tracker.seconds += waited
+        return waited
+
+    def reconcile(self, estimated: int, actual: int):
+        """Correct the token bucket once the real usage of a request is known."""
+        if self.tpm:
+            self._tokens -= actual - estimated
+
+    def observe_headers(self, headers):
+        """Sync the buckets with the provider's remaining-requests/tokens headers.
+
+        Once either is exhausted, requests are held until the reported reset.
+        """
+        if not headers:
+            return
+        headers = {str(k).lower().replace("llm_provider-", ""): v for k, v in dict(headers).items()}
+        now = time.monotonic()
+        self._refill(now)
+        for kind in ("requests", "tokens"):
+            remaining = _header(headers, f"x-ratelimit-remaining-{kind}", f"anthropic-ratelimit-{kind}-remaining")
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except (TypeError, ValueError):
+                continue
+            if kind == "requests":
+                self._requests = min(self._requests, remaining)
+            elif self.tpm:
+                self._tokens = min(self._tokens, remaining)
+            if remaining < 1:
+                reset = _parse_reset(_header(headers, f"x-ratelimit-reset-{kind}", f"anthropic-ratelimit-{kind}-reset") or "")
+                if reset:
+                    self._blocked_until = max(self._blocked_until, now + reset)
+                    self.total_header_pauses += 1
+                    logger.info(f"Provider reports no {kind} left; holding requests for {reset:.2f}s")
+
+    def penalize(self, retry_after: Optional[float] = None):
+        """Back off after the provider answered 429."""
+        now = time.monotonic()
+        self._refill(now)
+        self._requests = min(self._requests, 0.0)
+        delay = retry_after if retry_after else 60 / self.rpm
+        self._blocked_until = max(self._blocked_until, now + delay)
+        logger.warning(f"Provider rate limited the request; pausing for {delay:.2f}s")
+
+    def stats(self) -> dict:
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "requests": self.total_requests,
+            "wait_seconds": round(self.total_wait, 3),
+            "header_pauses": self.total_header_pauses,
+        }
+
+
+_LIMITERS: dict[tuple, TokenBucketLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_limiter(provider: str, model: str, api_key: str, rpm: int, tpm: int = 0) -> TokenBucketLimiter:
+    """Return the limiter shared by every client of the same provider, model and api key."""
+    key_digest = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    key = (provider, model, key_digest)
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(key)
+        if limiter is None:
+            limiter = TokenBucketLimiter(rpm=rpm, tpm=tpm)
+            _LIMITERS[key] = limiter
+    return limiter
+
+
+def is_rate_limit_error(err: Exception) -> bool:
+    if getattr(err, "status_code", None) == 429:
+        return True
+    return "RateLimit" in type(err).__name__
+
+
+def retry_after_seconds(err: Exception) -> Optional[float]:
+    """Read a Retry-After hint from a provider error, if any."""
+    response = getattr(err, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        if value is not None:
+            return float(value)
+        value = headers.get("x-ratelimit-reset-requests")
+        return _parse_reset(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def response_headers(response) -> dict:
+    """Provider response headers of a LiteLLM response or stream, if exposed."""
+    hidden = getattr(response, "_hidden_params", None) or {}
+    return hidden.get("additional_headers") or getattr(response, "_response_headers", None) or {}
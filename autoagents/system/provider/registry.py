@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Registry of shared LLM clients.
+
+Roles and actions ask the registry for a client instead of constructing their
+own, so every (proxy, api_key, model) combination maps to one LLMAPI object.
+"""
+import threading
+
+import cfg
+from autoagents.system.provider.cassette import CassetteLLMAPI, get_cassette
+from autoagents.system.provider.http_pool import pool_stats
+from autoagents.system.provider.llm_api import LLMAPI
+from autoagents.system.provider.router import latency_report
+from autoagents.system.utils.singleton import Singleton
+
+
+class LLMRegistry(metaclass=Singleton):
+    """Hand out pooled LLMAPI clients keyed on (proxy, api_key, model)."""
+
+    def __init__(self):
+        self._clients: dict[tuple, LLMAPI] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, proxy: str = "", api_key: str = "", model: str = None) -> LLMAPI:
+        key = (proxy or "", api_key or "", model or cfg.LLM_MODEL)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self.hits += 1
+                return client
+            self.misses += 1
+            client_cls = CassetteLLMAPI if cfg.LLM_CASSETTE_MODE else LLMAPI
+            client = client_cls(proxy=key[0], api_key=key[1], model=key[2])
+            self._clients[key] = client
+            return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            clients = [
+                {
+                    "proxy": proxy or None,
+                    "model": model,
+                    "requests": client.request_count,
+                    "coalesced": client.coalesced_count,
+                }
+                for (proxy, _, model), client in self._clients.items()
+            ]
+        stats = {
+            "clients": len(clients),
+            "hits": self.hits,
+            "misses": self.misses,
+            "per_client": clients,
+            "http_pool": pool_stats(),
+            "latency": latency_report(),
+        }
+        if cfg.LLM_CASSETTE_MODE:
+            stats["cassette"] = get_cassette().stats()
+        return stats
+
+
+def get_llm(proxy: str = "", api_key: str = "", model: str = None) -> LLMAPI:
+    """Return the shared client for the given proxy, key and model."""
+    return LLMRegistry().get(proxy, api_key, model)
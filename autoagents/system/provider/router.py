@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Hedged requests and latency-aware fallback across an ordered list of models.
+
+The primary model is tried first. If it has not produced a first token within
+a deadline derived from its rolling p95 time-to-first-token, or if it fails,
+the next model is started as well. Time spent queued on the rate limiter
+counts neither toward the time-to-first-token nor toward the deadline. The first endpoint to produce a token wins
+and the others are cancelled.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator
+
+import cfg
+from autoagents.system.logs import logger
+
+# Minimum number of samples before the rolling p95 is trusted
+_MIN_SAMPLES = 5
+
+
+class LatencyStats:
+    """Rolling time-to-first-token and total latency samples for one endpoint."""
+
+    def __init__(self, window: int = 100):
+        self.ttft = deque(maxlen=window)
+        self.total = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.hedged = 0
+        self.wins = 0
+
+    @staticmethod
+    def _percentile(samples, p: float):
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        idx = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+        return ordered[idx]
+
+    def record(self, ttft: float, total: float):
+        self.ttft.append(ttft)
+        self.total.append(total)
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for a first token before hedging to the next endpoint."""
+        if len(self.ttft) < _MIN_SAMPLES:
+            return cfg.LLM_HEDGE_MAX_DELAY
+        p95 = self._percentile(self.ttft, 95)
+        return min(cfg.LLM_HEDGE_MAX_DELAY, max(cfg.LLM_HEDGE_MIN_DELAY, p95))
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "hedged": self.hedged,
+            "wins": self.wins,
+            "ttft_p50": self._percentile(self.ttft, 50),
+            "ttft_p95": self._percentile(self.ttft, 95),
+            "total_p50": self._percentile(self.total, 50),
+            "total_p95": self._percentile(self.total, 95),
+        }
+
+
+_STATS: dict[str, LatencyStats] = {}
+_STATS_LOCK = threading.Lock()
+
+
+def get_latency_stats(model: str) -> LatencyStats:
+    """Return the process-wide latency statistics of `model`."""
+    with _STATS_LOCK:
+        stats = _STATS.get(model)
+        if stats is None:
+            stats = _STATS[model] = LatencyStats(cfg.LLM_LATENCY_WINDOW)
+    return stats
+
+
+def latency_report() -> dict:
+    with _STATS_LOCK:
+        return {model: stats.snapshot() for model, stats in _STATS.items()}
+
+
+class HedgedRouter:
+    """Route streamed completions over an ordered list of models with hedging."""
+
+    def __init__(self, llm, models: list[str]):
+        self.llm = llm
+        self.models = list(dict.fromkeys(m for m in models if m))
+
+    async def _attempt(self, idx: int, model: str, messages: list[dict], kwargs: dict,
+                       usage: dict, events: asyncio.Queue):
+        stats = get_latency_stats(model)
+        stats.requests += 1
+        start = first = None
+
+        def _acquired():
+            nonlocal start
+            start = time.monotonic()
+            events.put_nowait((idx, "sent", None))
+
+        try:
+            async for delta in self.llm._astream(messages, {**kwargs, "model": model}, usage, _acquired):
+                if first is None:
+                    first = time.monotonic() - start
+                await events.put((idx, "delta", delta))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stats.failures += 1
+            await events.put((idx, "error", e))
+            return
+        stats.record(first if first is not None else time.monotonic() - start, time.monotonic() - start)
+        await events.put((idx, "done", None))
+
+    async def stream(self, messages: list[dict], kwargs: dict, usage_out: dict = None) -> AsyncIterator[str]:
+        """Yield the deltas of whichever endpoint produces a first token first."""
+        events: asyncio.Queue = asyncio.Queue()
+        tasks: list[asyncio.Task] = []
+        usages: list[dict] = []
+        failed: set[int] = set()
+        winner, last_error = None, None
+        deadline = None
+
+        def _launch():
+            nonlocal deadline
+            idx = len(tasks)
+            model = self.models[idx]
+            if idx > 0:
+                get_latency_stats(model).hedged += 1
+                logger.info(f"Hedging LLM request to {model}")
+            usages.append({})
+            tasks.append(asyncio.ensure_future(self._attempt(idx, model, messages, kwargs, usages[idx], events)))
+            # The hedge timer starts when the request is sent, not while it waits for the limiter
+            deadline = None
+
+        try:
+            _launch()
+            while True:
+                timeout = None
+                if winner is None and deadline is not None and len(tasks) < len(self.models):
+                    timeout = max(0.0, deadline - time.monotonic())
+                try:
+                    idx, kind, payload = await asyncio.wait_for(events.get(), timeout)
+                except asyncio.TimeoutError:
+                    _launch()
+                    continue
+                if kind == "sent":
+                    if idx == len(tasks) - 1:
+                        deadline = time.monotonic() + get_latency_stats(self.models[idx]).hedge_delay()
+                    continue
+                if winner is None:
+                    if kind == "error":
+                        failed.add(idx)
+                        last_error = payload
+                        logger.warning(f"LLM endpoint {self.models[idx]} failed: {payload}")
+                        if len(tasks) < len(self.models):
+                            _launch()
+                        elif len(failed) == len(tasks):
+                            raise last_error
+                        continue
+                    winner = idx
+                    get_latency_stats(self.models[idx]).wins += 1
+                    for i, task in enumerate(tasks):
+                        if i != winner:
+                            task.cancel()
+                if idx != winner:
+                    continue
+                if kind == "error":
+                    raise payload
+                if kind == "done":
+                    break
+                yield payload
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            if usage_out is not None and winner is not None:
+                usage_out.update(usages[winner])
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Pluggable sink for streamed LLM deltas.
+
+The active sink and the tags describing who is streaming (task, role, action,
+step) are kept in context variables, so concurrently running roles sharing one
+LLM client each report their own deltas. Without a sink, deltas are printed to
+stdout as before.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+StreamSink = Callable[[str, dict], None]
+
+_stream_sink: ContextVar[Optional[StreamSink]] = ContextVar("llm_stream_sink", default=None)
+_stream_tags: ContextVar[Optional[dict]] = ContextVar("llm_stream_tags", default=None)
+
+
+def stdout_sink(delta: str, tags: dict):
+    print(delta, end="")
+
+
+def set_stream_sink(sink: Optional[StreamSink]):
+    """Install `sink` for the current context; returns a token for `reset_stream_sink`."""
+    return _stream_sink.set(sink)
+
+
+def reset_stream_sink(token):
+    _stream_sink.reset(token)
+
+
+def get_stream_sink() -> StreamSink:
+    return _stream_sink.get() or stdout_sink
+
+
+def get_stream_tags() -> dict:
+    return dict(_stream_tags.get() or {})
+
+
+@contextmanager
+def stream_tags(**tags):
+    """Merge `tags` into the stream tags for the duration of the block."""
+    token = _stream_tags.set({**(_stream_tags.get() or {}), **tags})
+    try:
+        yield
+    finally:
+        _stream_tags.reset(token)
+
+
+def emit_delta(delta: str):
+    """Forward one streamed delta to the active sink."""
+    if not delta:
+        return
+    get_stream_sink()(delta, get_stream_tags())
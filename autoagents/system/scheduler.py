@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Event-driven scheduling of roles in an Environment.
+
+Instead of running every role each round, the scheduler keeps a routing
+table from `cause_by` action types to the roles watching them and wakes only
+those roles when a matching message is published. Woken roles run
+concurrently as soon as their input arrives; a role woken while it is still
+running is run once more after it finishes.
+"""
+import asyncio
+import time
+from collections import defaultdict
+
+from autoagents.system.logs import logger
+from autoagents.system.schema import Message
+
+
+class RoleStats:
+    """Wake-ups and busy/idle time of one role."""
+
+    def __init__(self):
+        self.subscribed_at = time.monotonic()
+        self.wakeups = 0
+        self.runs = 0
+        self.busy_seconds = 0.0
+        self.queue_wait_seconds = 0.0
+
+    def snapshot(self) -> dict:
+        elapsed = time.monotonic() - self.subscribed_at
+        return {
+            "wakeups": self.wakeups,
+            "runs": self.runs,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "idle_seconds": round(max(0.0, elapsed - self.busy_seconds), 3),
+            "queue_wait_seconds": round(self.queue_wait_seconds, 3),
+        }
+
+
+class EventScheduler:
+    """Route published messages to subscribed roles and run them when woken."""
+
+    def __init__(self, env):
+        self.env = env
+        self.routes: dict[type, set[str]] = defaultdict(set)
+        self.role_stats: dict[str, RoleStats] = {}
+        self._ready: dict[str, float] = {}  # role name -> time it was woken, in wake order
+        self._running: dict[asyncio.Task, tuple[str, float]] = {}
+        self._wakeup = asyncio.Event()
+        self.published = 0
+        self.routed = 0
+        self.unrouted = 0
+        self.max_queue_depth = 0
+
+    def subscribe(self, name: str, role):
+        """Route the actions `role` watches to it, waking it for matching messages already published."""
+        for action in role.watch:
+            self.routes[action].add(name)
+        self.role_stats.setdefault(name, RoleStats())
+        if self.env.memory.get_by_actions(role.watch):
+            self._wake(name)
+
+    def notify(self, message: Message):
+        """Wake the roles subscribed to the action that caused `message`."""
+        self.published += 1
+        names = self.routes.get(message.cause_by) if message.cause_by else None
+        if not names:
+            self.unrouted += 1
+            return
+        self.routed += 1
+        for name in sorted(names):
+            self._wake(name)
+
+    def _wake(self, name: str):
+        self.role_stats[name].wakeups += 1
+        self._ready.setdefault(name, time.monotonic())
+        self.max_queue_depth = max(self.max_queue_depth, len(self._ready))
+        self._wakeup.set()
+
+    def _start_ready(self):
+        busy = {name for name, _ in self._running.values()}
+        for name in list(self._ready):
+            if name in busy:
+                continue  # runs again once the current run finishes
+            woken_at = self._ready.pop(name)
+            role = self.env.roles.get(name)
+            if role is None:
+                continue
+            now = time.monotonic()
+            stats = self.role_stats[name]
+            stats.queue_wait_seconds += now - woken_at
+            stats.runs += 1
+            self._running[asyncio.ensure_future(role.run())] = (name, now)
+
+    async def run(self):
+        """Run woken roles until none has pending input."""
+        try:
+            while True:
+                self._start_ready()
+                if not self._running:
+                    break
+                self._wakeup.clear()
+                waiter = asyncio.ensure_future(self._wakeup.wait())
+                done, _ = await asyncio.wait([*self._running, waiter], return_when=asyncio.FIRST_COMPLETED)
+                if not waiter.done():
+                    waiter.cancel()
+                for task in done:
+                    if task is waiter:
+                        continue
+                    name, started = self._running.pop(task)
+                    self.role_stats[name].busy_seconds += time.monotonic() - started
+                    task.result()
+        finally:
+            for task in self._running:
+                task.cancel()
+            self._running.clear()
+        logger.debug(f"Scheduler drained: {self.stats()}")
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._ready)
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "routed": self.routed,
+            "unrouted": self.unrouted,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "roles": {name: stats.snapshot() for name, stats in self.role_stats.items()},
+        }
@@ -6,7 +6,10 @@
 """
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+import hashlib
+import sys
+import uuid
+from dataclasses import FrozenInstanceError
 from typing import Type, TypedDict
 
 from pydantic import BaseModel
@@ -19,15 +22,80 @@ class RawMessage(TypedDict):
     role: str
 
 
-@dataclass
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
 class Message:
-    """Message structure: list[<role>: <content>]."""
-    content: str
-    instruct_content: BaseModel = field(default=None)
-    role: str = field(default='user')  # system / user / assistant
-    cause_by: Type["Action"] = field(default="")
-    sent_from: str = field(default="")
-    send_to: str = field(default="")
+    """Message structure: list[<role>: <content>].
+
+    Slotted rather than a dataclass, with the few distinct role, cause_by and
+    sender/receiver strings interned, so long-lived runs holding thousands of
+    messages pay no per-instance `__dict__`. `instruct_content` may be given as
+    a zero-argument callable; it is then built on first access.
+    """
+    __slots__ = ("content", "_instruct_content", "role", "cause_by", "sent_from", "send_to", "id", "content_hash")
+
+    def __init__(self, content: str, instruct_content: BaseModel = None, role: str = 'user',
+                 cause_by: Type["Action"] = "", sent_from: str = "", send_to: str = ""):
+        self.content = content
+        self._instruct_content = instruct_content
+        self.role = _intern(role)  # system / user / assistant
+        self.cause_by = _intern(cause_by)
+        self.sent_from = _intern(sent_from)
+        self.send_to = _intern(send_to)
+        # Identity and fingerprint, assigned at creation; they take no part in equality
+        self.id = uuid.uuid4().hex
+        self.content_hash = self.compute_hash()
+
+    @property
+    def instruct_content(self) -> BaseModel:
+        if callable(self._instruct_content):
+            object.__setattr__(self, "_instruct_content", self._instruct_content())
+        return self._instruct_content
+
+    @instruct_content.setter
+    def instruct_content(self, value: BaseModel):
+        self._instruct_content = value
+
+    def compute_hash(self) -> str:
+        """Fingerprint of the compared fields other than instruct_content; equal messages share it."""
+        cause_by = getattr(self.cause_by, '__qualname__', self.cause_by)
+        raw = "\0".join(map(str, (self.role, cause_by, self.sent_from, self.send_to, self.content)))
+        return hashlib.blake2b(raw.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        if self.content_hash != other.content_hash:
+            return False
+        return ((self.content, self.role, self.cause_by, self.sent_from, self.send_to, self.instruct_content)
+                == (other.content, other.role, other.cause_by, other.sent_from, other.send_to, other.instruct_content))
+
+    # Mutable and compared by value, like the dataclass it replaces
+    __hash__ = None
+
+    def __getstate__(self) -> dict:
+        return {
+            "content": self.content,
+            "instruct_content": self._instruct_content,
+            "role": self.role,
+            "cause_by": self.cause_by,
+            "sent_from": self.sent_from,
+            "send_to": self.send_to,
+            "id": self.id,
+            "content_hash": self.content_hash,
+        }
+
+    def __setstate__(self, state: dict):
+        # Also restores messages pickled when Message was a dataclass, which lack id and content_hash
+        set_ = object.__setattr__
+        set_(self, "content", state["content"])
+        set_(self, "_instruct_content", state.get("instruct_content"))
+        for name in ("role", "cause_by", "sent_from", "send_to"):
+            set_(self, name, _intern(state.get(name, "user" if name == "role" else "")))
+        set_(self, "id", state.get("id") or uuid.uuid4().hex)
+        set_(self, "content_hash", state.get("content_hash") or self.compute_hash())
 
     def __str__(self):
         # prefix = '-'.join([self.role, str(self.cause_by)])
@@ -43,25 +111,49 @@ class Message:
         }
 
 
-@dataclass
+class FrozenMessage(Message):
+    """Message that cannot be modified once created, and can therefore be hashed."""
+    __slots__ = ("_frozen",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        object.__setattr__(self, "_frozen", True)
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise FrozenInstanceError(f"cannot assign to field {name!r}")
+        super().__setattr__(name, value)
+
+    def __setstate__(self, state: dict):
+        super().__setstate__(state)
+        object.__setattr__(self, "_frozen", True)
+
+    def __hash__(self):
+        return hash(self.content_hash)
+
+
 class UserMessage(Message):
     """OpenAI-compatible user message."""
+    __slots__ = ()
+
     def __init__(self, content: str):
-        super().__init__(content, 'user')
+        super().__init__(content, role='user')
 
 
-@dataclass
 class SystemMessage(Message):
     """OpenAI-compatible system message."""
+    __slots__ = ()
+
     def __init__(self, content: str):
-        super().__init__(content, 'system')
+        super().__init__(content, role='system')
 
 
-@dataclass
 class AIMessage(Message):
     """OpenAI-compatible assistant message."""
+    __slots__ = ()
+
     def __init__(self, content: str):
-        super().__init__(content, 'assistant')
+        super().__init__(content, role='assistant')
 
 
 if __name__ == '__main__':
@@ -73,3 +165,37 @@ if __name__ == '__main__':
         Message(test_content, role='QA')
     ]
     logger.info(msgs)
+
+    # Memory per message and construction time against the dataclass Message this replaces
+    import timeit
+    import tracemalloc
+    from dataclasses import dataclass, field
+
+    @dataclass
+    class DataclassMessage:
+        content: str
+        instruct_content: BaseModel = field(default=None)
+        role: str = field(default='user')
+        cause_by: Type["Action"] = field(default="")
+        sent_from: str = field(default="")
+        send_to: str = field(default="")
+        id: str = field(default="", init=False, compare=False)
+        content_hash: str = field(default="", init=False, compare=False)
+
+        def __post_init__(self):
+            self.id = uuid.uuid4().hex
+            self.content_hash = Message.compute_hash(self)
+
+    n = 10_000
+    contents = [f"message {i}" for i in range(n)]
+    for cls in (DataclassMessage, Message, FrozenMessage):
+        # Roles arrive as fresh strings, e.g. parsed from LLM output
+        roles = ["".join(["Plan", " ", "Observer"]) for _ in range(n)]
+        tracemalloc.start()
+        kept = [cls(c, role=r, cause_by="CheckPlans") for c, r in zip(contents, roles)]
+        del roles
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        seconds = timeit.timeit(lambda: cls("message", role="Plan Observer", cause_by="CheckPlans"), number=n)
+        logger.info(f"{cls.__name__}: {size / n:.0f} bytes per message, {seconds / n * 1e6:.2f}us to construct")
+        del kept
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Bounded-concurrency work-queue executor.
+
+Keeps up to `concurrency` calls in flight at all times and yields each result
+as soon as it completes, tagged with the index of its input, instead of
+running the work in lockstep waves.
+"""
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def bounded_as_completed(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    concurrency: int,
+    timeout: Optional[float] = None,
+    return_exceptions: bool = False,
+) -> AsyncIterator[Tuple[int, R]]:
+    """Yield `(index, func(item))` pairs in completion order.
+
+    Items are pulled lazily, so a new call starts the moment a slot frees up.
+    A call exceeding `timeout` seconds fails with `asyncio.TimeoutError`. Errors
+    are raised unless `return_exceptions` is set, in which case the exception is
+    yielded as the result. Closing the generator cancels every pending call.
+    """
+    concurrency = max(1, int(concurrency))
+    source = enumerate(items)
+    running: dict[asyncio.Future, int] = {}
+    finished: list[Tuple[int, asyncio.Future]] = []
+
+    def _start_next() -> bool:
+        try:
+            index, item = next(source)
+        except StopIteration:
+            return False
+        call = func(item)
+        if timeout:
+            call = asyncio.wait_for(call, timeout)
+        running[asyncio.ensure_future(call)] = index
+        return True
+
+    try:
+        while len(running) < concurrency and _start_next():
+            pass
+        while running:
+            done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+            finished = sorted((running.pop(task), task) for task in done)
+            # Refill the freed slots before handing results back
+            for _ in finished:
+                _start_next()
+            while finished:
+                index, task = finished.pop(0)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    result = e
+                yield index, result
+    finally:
+        # Completed calls that will never be handed out: retrieve their errors so asyncio does not log them
+        for _, task in finished:
+            if not task.cancelled():
+                task.exception()
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running.keys(), return_exceptions=True)
@@ -10,6 +10,8 @@ import ast
 import inspect
 import os
 import re
+import string
+from functools import lru_cache
 from typing import List, Tuple
 
 from autoagents.system.logs import logger
@@ -131,6 +133,94 @@ class OutputParser:
         return parsed_data
 
 
+class StreamingSectionParser:
+    """Incrementally split a streamed '## <title>' response into sections.
+
+    A section is emitted as soon as the next '##' arrives, splitting exactly like
+    OutputParser.parse_blocks does on the finished text. Sections named in
+    `mapping` are validated on arrival, and `complete` turns true once every
+    mapped section has closed, so the caller can stop the stream early.
+    """
+
+    def __init__(self, mapping: dict = None):
+        self.mapping = mapping or {}
+        self.sections: dict[str, str] = {}
+        self.errors: dict[str, str] = {}
+        self._chunks: list[str] = []
+        self._open = ""
+        self._offset = 0  # position of the open block in the full text
+        self._cut = None
+        self._complete = False
+
+    @property
+    def complete(self) -> bool:
+        return self._complete
+
+    @property
+    def missing(self) -> list[str]:
+        return [key for key in self.mapping if key not in self.sections]
+
+    @property
+    def text(self) -> str:
+        """The consumed text, up to the end of the last required section once complete."""
+        text = "".join(self._chunks)
+        return text if self._cut is None else text[:self._cut]
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        """Consume one streamed chunk; return the sections it closed."""
+        if self.complete:
+            return []
+        self._chunks.append(chunk)
+        search_from = max(0, len(self._open) - 1)  # a '##' may straddle two chunks
+        self._open += chunk
+        closed = []
+        while not self.complete:
+            idx = self._open.find("##", search_from)
+            if idx == -1:
+                break
+            self._close_block(self._open[:idx], closed)
+            if self.complete:
+                self._cut = self._offset + idx
+            self._offset += idx + 2
+            self._open = self._open[idx + 2:]
+            search_from = 0
+        return closed
+
+    def close(self) -> list[tuple[str, str]]:
+        """Flush the trailing block once the stream has ended."""
+        closed = []
+        if not self.complete:
+            self._close_block(self._open, closed)
+            self._open = ""
+        return closed
+
+    def _close_block(self, block: str, closed: list):
+        if block.strip() == "":
+            return
+        title, _, content = block.partition("\n")
+        title = title.strip()
+        if title.endswith(":"):
+            title = title[:-1].strip()
+        content = content.strip()
+        self.sections[title] = content
+        closed.append((title, content))
+        if title in self.mapping:
+            self._validate(title, content)
+            self._complete = not self.missing
+
+    def _validate(self, title: str, content: str):
+        typing_define = self.mapping[title]
+        typing = typing_define[0] if isinstance(typing_define, tuple) else typing_define
+        self.errors.pop(title, None)
+        if not content:
+            self.errors[title] = "empty section"
+        elif typing == List[str] or typing == List[Tuple[str, str]]:
+            try:
+                OutputParser.parse_file_list(text=content)
+            except Exception as e:
+                self.errors[title] = f"not a list: {e}"
+
+
 class CodeParser:
 
     @classmethod
@@ -199,6 +289,36 @@ class CodeParser:
         return tasks
 
 
+_SECTION_HEADER = re.compile(r"^#{1,6} ", re.M)
+
+
+@lru_cache(maxsize=64)
+def _template_sections(template: str) -> tuple[tuple[str, frozenset], ...]:
+    starts = [0] + [m.start() for m in _SECTION_HEADER.finditer(template) if m.start() > 0]
+    bounds = zip(starts, starts[1:] + [len(template)])
+    formatter = string.Formatter()
+    sections = []
+    for begin, end in bounds:
+        section = template[begin:end]
+        fields = frozenset(field for _, field, _, _ in formatter.parse(section) if field)
+        sections.append((section, fields))
+    return tuple(sections)
+
+
+def split_prompt_template(template: str, dynamic_fields, **kwargs) -> Tuple[str, str]:
+    """Format a markdown prompt template into its static and dynamic parts.
+
+    The template is split on its "# " headers. Sections using any of
+    `dynamic_fields` form the dynamic part, all others the static part; both
+    keep the original section order.
+    """
+    dynamic_fields = set(dynamic_fields)
+    static, dynamic = [], []
+    for section, fields in _template_sections(template):
+        (dynamic if fields & dynamic_fields else static).append(section.format(**kwargs))
+    return "".join(static).strip(), "".join(dynamic).strip()
+
+
 class NoMoneyException(Exception):
     """Raised when the operation cannot be completed due to insufficient funds"""
 
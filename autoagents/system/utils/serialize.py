@@ -63,13 +63,24 @@ def serialize_message(message: Message):
     return msg_ser
 
 
+class InstructContentLoader:
+    """Picklable factory rebuilding a serialized `instruct_content` when it is first read."""
+
+    def __init__(self, class_name: str, mapping: Dict, value: Dict):
+        self.class_name = class_name
+        self.mapping = mapping
+        self.value = value
+
+    def __call__(self):
+        ic_obj = ActionOutput.create_model_class(class_name=self.class_name, mapping=self.mapping)
+        return ic_obj(**self.value)
+
+
 def deserialize_message(message_ser: str) -> Message:
     message = pickle.loads(message_ser)
-    if message.instruct_content:
-        ic = message.instruct_content
-        ic_obj = ActionOutput.create_model_class(class_name=ic['class'],
-                                                 mapping=ic['mapping'])
-        ic_new = ic_obj(**ic['value'])
-        message.instruct_content = ic_new
+    ic = message._instruct_content
+    if ic and isinstance(ic, dict):
+        # Built lazily: recovered memories are mostly never inspected
+        message.instruct_content = InstructContentLoader(ic['class'], ic['mapping'], ic['value'])
 
     return message
@@ -9,8 +9,14 @@ ref1: https://github.com/openai/openai-cookbook/blob/main/examples/How_to_count_
 ref2: https://github.com/Significant-Gravitas/Auto-GPT/blob/master/autogpt/llm/token_counter.py
 ref3: https://github.com/hwchase17/langchain/blob/master/langchain/chat_models/openai.py
 """
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+
 import tiktoken
 
+from autoagents.system.logs import logger
+
 TOKEN_COSTS = {
     "gpt-3.5-turbo": {"prompt": 0.0015, "completion": 0.002},
     "gpt-3.5-turbo-0301": {"prompt": 0.0015, "completion": 0.002},
@@ -26,25 +32,31 @@ TOKEN_COSTS = {
 }
 
 
-def count_message_tokens(messages, model="gpt-3.5-turbo-0613"):
-    """Return the number of tokens used by a list of messages.
+# Memoized token counts keyed on (encoding, blake2b digest of the text); texts themselves are not retained
+_COUNT_CACHE: "OrderedDict[tuple, int]" = OrderedDict()
+_COUNT_CACHE_SIZE = 4096
+# Rough characters-per-token ratio of BPE encodings on English text and code
+_APPROX_CHARS_PER_TOKEN = 4
 
-    Falls back to a reasonable ChatML heuristic for unknown models
-    instead of raising, so newer model names won't break execution.
-    """
-    # Choose an encoding, falling back safely if the model is unknown
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    """Return the tiktoken encoding for `model`, resolving each model name once."""
     try:
-        encoding = tiktoken.encoding_for_model(model)
+        return tiktoken.encoding_for_model(model)
     except KeyError:
         # Default to cl100k_base which works for GPT-3.5/4 style models
-        print("Warning: model not found. Using cl100k_base encoding.")
+        logger.debug(f"Model {model!r} not found. Using cl100k_base encoding.")
         try:
-            encoding = tiktoken.get_encoding("cl100k_base")
+            return tiktoken.get_encoding("cl100k_base")
         except Exception:
             # As a final safeguard, use tiktoken's default encoding
-            encoding = tiktoken.get_encoding("gpt2")
+            return tiktoken.get_encoding("gpt2")
 
-    # Token accounting per message based on ChatML format
+
+@lru_cache(maxsize=None)
+def _message_overhead(model: str) -> tuple:
+    """Return (tokens_per_message, tokens_per_name, encoding model) for the ChatML format."""
     if model in {
         "gpt-3.5-turbo-0613",
         "gpt-3.5-turbo-16k-0613",
@@ -53,59 +65,109 @@ def count_message_tokens(messages, model="gpt-3.5-turbo-0613"):
         "gpt-4-0613",
         "gpt-4-32k-0613",
     }:
-        tokens_per_message = 3
-        tokens_per_name = 1
-    elif model == "gpt-3.5-turbo-0301":
+        return 3, 1, model
+    if model == "gpt-3.5-turbo-0301":
         # every message follows <|start|>{role/name}\n{content}<|end|>\n
-        tokens_per_message = 4
         # if there's a name, the role is omitted
-        tokens_per_name = -1
-    elif "gpt-3.5-turbo" in model:
-        print(
-            "Warning: gpt-3.5-turbo may update over time. Returning num tokens assuming gpt-3.5-turbo-0613."
-        )
-        return count_message_tokens(messages, model="gpt-3.5-turbo-0613")
-    elif "gpt-4" in model:
-        print(
-            "Warning: gpt-4 may update over time. Returning num tokens assuming gpt-4-0613."
-        )
-        return count_message_tokens(messages, model="gpt-4-0613")
-    else:
-        # Default heuristic for unknown/new model names
-        # Most ChatML-compatible chat models follow 3/1 accounting
-        print(
-            f"Warning: Unknown model '{model}'. Using ChatML heuristic (tokens_per_message=3, tokens_per_name=1)."
-        )
-        tokens_per_message = 3
-        tokens_per_name = 1
+        return 4, -1, model
+    if "gpt-3.5-turbo" in model:
+        logger.debug("gpt-3.5-turbo may update over time. Counting tokens assuming gpt-3.5-turbo-0613.")
+        return _message_overhead("gpt-3.5-turbo-0613")
+    if "gpt-4" in model:
+        logger.debug("gpt-4 may update over time. Counting tokens assuming gpt-4-0613.")
+        return _message_overhead("gpt-4-0613")
+    # Default heuristic for unknown/new model names
+    # Most ChatML-compatible chat models follow 3/1 accounting
+    logger.debug(f"Unknown model {model!r}. Using ChatML heuristic (tokens_per_message=3, tokens_per_name=1).")
+    return 3, 1, model
+
+
+def _count_text_tokens(text: str, model: str, approximate: bool = False) -> int:
+    if approximate:
+        return (len(text) + _APPROX_CHARS_PER_TOKEN - 1) // _APPROX_CHARS_PER_TOKEN
+    encoding = _get_encoding(model)
+    key = (encoding.name, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest())
+    count = _COUNT_CACHE.get(key)
+    if count is not None:
+        _COUNT_CACHE.move_to_end(key)
+        return count
+    count = len(encoding.encode(text))
+    _COUNT_CACHE[key] = count
+    if len(_COUNT_CACHE) > _COUNT_CACHE_SIZE:
+        _COUNT_CACHE.popitem(last=False)
+    return count
+
+
+def count_message_tokens(messages, model="gpt-3.5-turbo-0613", approximate=False):
+    """Return the number of tokens used by a list of messages.
+
+    Falls back to a reasonable ChatML heuristic for unknown models
+    instead of raising, so newer model names won't break execution.
+    Message contents are memoized, so repeated system prefixes and format
+    examples are only encoded once. `approximate=True` skips the tokenizer
+    and estimates from the character count, which is enough for budgeting.
+    """
+    tokens_per_message, tokens_per_name, encoding_model = _message_overhead(model)
     num_tokens = 0
     for message in messages:
         num_tokens += tokens_per_message
         for key, value in message.items():
-            num_tokens += len(encoding.encode(value))
+            if not isinstance(value, str):
+                value = str(value)
+            num_tokens += _count_text_tokens(value, encoding_model, approximate)
             if key == "name":
                 num_tokens += tokens_per_name
     num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
     return num_tokens
 
 
-def count_string_tokens(string: str, model_name: str) -> int:
+def count_string_tokens(string: str, model_name: str, approximate: bool = False) -> int:
     """
     Returns the number of tokens in a text string.
 
     Args:
         string (str): The text string.
         model_name (str): The name of the encoding to use. (e.g., "gpt-3.5-turbo")
+        approximate (bool): Estimate from the character count instead of encoding.
 
     Returns:
         int: The number of tokens in the text string.
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model_name)
-    except KeyError:
-        # Fallback encodings for unknown models
-        try:
-            encoding = tiktoken.get_encoding("cl100k_base")
-        except Exception:
-            encoding = tiktoken.get_encoding("gpt2")
-    return len(encoding.encode(string))
+    return _count_text_tokens(string, model_name, approximate)
+
+
+def elide_string_tokens(string: str, model_name: str, max_tokens: int, marker: str = " ...[{n} tokens elided]... ") -> str:
+    """Shorten `string` to about `max_tokens` tokens, keeping its head and tail around `marker`."""
+    encoding = _get_encoding(model_name)
+    tokens = encoding.encode(string)
+    if len(tokens) <= max_tokens:
+        return string
+    keep = max(0, max_tokens - len(encoding.encode(marker.format(n=len(tokens)))))
+    head = keep * 2 // 3
+    tail = keep - head
+    elided = len(tokens) - head - tail
+    return (encoding.decode(tokens[:head]) + marker.format(n=elided)
+            + (encoding.decode(tokens[-tail:]) if tail else ""))
+
+
+if __name__ == '__main__':
+    import timeit
+
+    from autoagents.actions.create_roles import FORMAT_EXAMPLE, PROMPT_TEMPLATE
+
+    model = "gpt-4o"
+    prefix = "You are a Manager, named Ethan, your goal is Efficiently to finish the tasks or solve the problem. "
+    body = "\n".join(f"{i}. step {i}: search the web and summarize the findings" for i in range(1200))
+    messages = [
+        {"role": "system", "content": prefix},
+        {"role": "system", "content": PROMPT_TEMPLATE + FORMAT_EXAMPLE},
+        {"role": "user", "content": body},
+    ]
+    n = 20
+    cold = timeit.timeit(
+        lambda: (_COUNT_CACHE.clear(), count_message_tokens(messages, model)), number=n) / n
+    warm = timeit.timeit(lambda: count_message_tokens(messages, model), number=n) / n
+    approx = timeit.timeit(lambda: count_message_tokens(messages, model, approximate=True), number=n) / n
+    logger.info(f"{count_message_tokens(messages, model)} tokens "
+                f"(approximate {count_message_tokens(messages, model, approximate=True)})")
+    logger.info(f"cold {cold * 1000:.3f}ms | memoized {warm * 1000:.3f}ms | approximate {approx * 1000:.3f}ms")
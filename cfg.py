@@ -37,6 +37,10 @@ def _as_bool(name: str, default: bool = False) -> bool:
 RPM = _as_int("RPM", 10) or 10
 # Ensure RPM is at least 1
 RPM = max(1, int(RPM))
+# Maximum number of requests kept in flight by batch execution
+LLM_MAX_CONCURRENCY = max(1, _as_int("LLM_MAX_CONCURRENCY", RPM) or RPM)
+# Tokens-per-minute budget shared by all clients of one provider/model/key (0 disables)
+TPM = max(0, _as_int("TPM", 0) or 0)
 
 MAX_TOKENS = _as_int("MAX_TOKENS", None)
 
@@ -100,6 +104,11 @@ SELENIUM_BROWSER_TYPE = os.getenv("SELENIUM_BROWSER_TYPE", "chrome")
 # Network / timeouts
 LLM_TIMEOUT = _as_float("LLM_TIMEOUT", 60.0) or 60.0
 
+# Pooled keep-alive HTTP transport shared by all LLM clients
+LLM_HTTP_MAX_CONNECTIONS = max(1, _as_int("LLM_HTTP_MAX_CONNECTIONS", 100) or 100)
+LLM_HTTP_MAX_KEEPALIVE = max(0, _as_int("LLM_HTTP_MAX_KEEPALIVE", 20) or 0)
+LLM_HTTP_KEEPALIVE_EXPIRY = _as_float("LLM_HTTP_KEEPALIVE_EXPIRY", 60.0) or 60.0
+
 # Optional: inject proxies into HTTP client env (e.g., httpx/requests)
 _proxy_to_apply = OPENAI_PROXY or GLOBAL_PROXY
 if _proxy_to_apply:
@@ -110,3 +119,57 @@ if _proxy_to_apply:
 # LLM parsing repair/safeguards
 LLM_PARSER_REPAIR = _as_bool("LLM_PARSER_REPAIR", True)
 LLM_PARSER_REPAIR_ATTEMPTS = max(0, _as_int("LLM_PARSER_REPAIR_ATTEMPTS", 1) or 1)
+
+# Hedged fallback routing: comma-separated models tried after OPENAI_API_MODEL
+LLM_FALLBACK_MODELS = [m.strip() for m in os.getenv("LLM_FALLBACK_MODELS", "").split(",") if m.strip()]
+# Bounds (seconds) of the p95 time-to-first-token deadline before hedging to the next model
+LLM_HEDGE_MIN_DELAY = _as_float("LLM_HEDGE_MIN_DELAY", 2.0) or 2.0
+LLM_HEDGE_MAX_DELAY = _as_float("LLM_HEDGE_MAX_DELAY", 20.0) or 20.0
+LLM_LATENCY_WINDOW = max(1, _as_int("LLM_LATENCY_WINDOW", 100) or 100)
+
+# Prompt-prefix caching: static instructions first, cache-control markers, cached-token reporting
+LLM_PROMPT_CACHE = _as_bool("LLM_PROMPT_CACHE", False)
+
+# Coalesce identical concurrent LLM requests into a single provider call
+LLM_SINGLE_FLIGHT = _as_bool("LLM_SINGLE_FLIGHT", True)
+
+# Persistent LLM response cache (SQLite, shared across worker processes)
+LLM_CACHE = _as_bool("LLM_CACHE", False)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+LLM_CACHE_MAX_BYTES = max(0, _as_int("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024) or 0)
+LLM_CACHE_TTL = max(0.0, _as_float("LLM_CACHE_TTL", 7 * 24 * 3600.0) or 0.0)
+
+# Record/replay LLM cassette for offline runs: "record", "replay" or empty to disable
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "").strip().lower()
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "")
+# Replay latency as a multiple of the recorded timings (0 serves responses instantly)
+LLM_CASSETTE_LATENCY = max(0.0, _as_float("LLM_CASSETTE_LATENCY", 0.0) or 0.0)
+
+# Token budget of the memory context rendered into role and action prompts (0 disables trimming)
+CONTEXT_TOKEN_BUDGET = max(0, _as_int("CONTEXT_TOKEN_BUDGET", 8000) or 0)
+
+# Run the Manager's role and plan critiques concurrently and stop once they converge
+MANAGER_PARALLEL_CHECKS = _as_bool("MANAGER_PARALLEL_CHECKS", False)
+
+# Stop streaming a structured reply once every expected "## <section>" has been received
+LLM_STREAM_EARLY_STOP = _as_bool("LLM_STREAM_EARLY_STOP", False)
+
+# Ask for provider-enforced JSON matching each action's output mapping; falls back to the markdown parser
+LLM_STRUCTURED_OUTPUT = _as_bool("LLM_STRUCTURED_OUTPUT", False)
+
+# Environment scheduling: "event" wakes only roles watching a new message, "round" runs every role each round
+ENV_SCHEDULER = os.getenv("ENV_SCHEDULER", "round").strip().lower()
+
+# Execution Plan steps a Group runs at once when the plan marks them independent (1 runs them one by one)
+GROUP_MAX_PARALLEL_STEPS = max(1, _as_int("GROUP_MAX_PARALLEL_STEPS", 1) or 1)
+
+# Run the roles named in one plan step concurrently; each round they all see the same completed substeps
+GROUP_PARALLEL_ROLES = _as_bool("GROUP_PARALLEL_ROLES", False)
+
+# Run artifacts under workspace/agents_logs: "markdown" (history/process/result files), "jsonl" (one events.jsonl), "both" or "none"
+ENV_ARTIFACTS = os.getenv("ENV_ARTIFACTS", "markdown").strip().lower()
+# Seconds the background artifact writer batches records before writing them
+ENV_ARTIFACT_FLUSH_INTERVAL = max(0.0, _as_float("ENV_ARTIFACT_FLUSH_INTERVAL", 1.0) or 0.0)
+
+# Keep a word and role index of the environment's messages for content, keyword and prefix queries
+MEMORY_FULL_TEXT_INDEX = _as_bool("MEMORY_FULL_TEXT_INDEX", False)
@@ -5,6 +5,7 @@ import json
 class MessageType(Enum):
     RunTask = "run_task"
     Interrupt = "interrupt"
+    StreamDelta = "stream_delta"
 
 def timestamp():
     return datetime.strftime(datetime.now(), "%Y-%m-%d_%H:%M:%S.%f")
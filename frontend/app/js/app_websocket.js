@@ -659,6 +659,34 @@ clearButton.addEventListener('click', async () => {
     await clearChat();
 });
 
+// Live preview of the reply currently being streamed by an agent
+let streamBuffer = { key: null, text: '' };
+function renderStreamDelta(data) {
+    const key = [data['role'], data['action'], data['step']].join('|');
+    if (streamBuffer.key !== key) {
+        streamBuffer = { key: key, text: '' };
+    }
+    streamBuffer.text += data['delta'];
+
+    let node = document.getElementById('stream-preview');
+    if (isEmpty(node)) {
+        node = document.createElement('p');
+        node.id = 'stream-preview';
+        node.className = 'calling-message fs';
+        document.getElementById('calling-next-agent').after(node);
+    }
+    const label = (data['action'] || data['role'] || 'Agent').replace('_Action', '').replace(/_/g, ' ');
+    node.style.display = 'block';
+    node.textContent = label + ': ' + streamBuffer.text.slice(-300);
+}
+function hideStreamPreview() {
+    const node = document.getElementById('stream-preview');
+    if (!isEmpty(node)) {
+        node.style.display = 'none';
+    }
+    streamBuffer = { key: null, text: '' };
+}
+
 // Websocket connection
 async function connect() {
     ws = new WebSocket(apiHost);
@@ -677,6 +705,7 @@ async function connect() {
             // nothing to do
             if (response['msg'] == 'ok') {
                 taskId = response['data']['task_id'];
+                hideStreamPreview();
                 // console.log(response["data"])
                 let responseData = [response["data"]];
                 // data rendering fxns
@@ -697,6 +726,7 @@ async function connect() {
                 
                 clearButton.style.display = '';
                 document.getElementById('calling-next-agent').style.display = 'none';
+                hideStreamPreview();
                 
             } else {
                 // errors
@@ -705,6 +735,9 @@ async function connect() {
                 alert("An error occurred in the task, please check the logs.");
             }
         }
+        else if (response['action'] == "stream_delta") {
+            renderStreamDelta(response['data']);
+        }
         else if (response['action'] == "interrupt") {
             if (response['msg'] == 'ok') {
                 console.log("task: " + taskId + " interrupted.");
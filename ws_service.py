@@ -11,9 +11,14 @@ import logging
 from multiprocessing import current_process, Process, Queue, queues
 
 from common import MessageType, format_message, timestamp
+from autoagents.system.provider.http_pool import aclose_sessions
 import startup
 user_dict = {}
 
+# Stream deltas arrive token by token; poll often and send them in small merged batches
+SEND_POLL_INTERVAL = 0.05
+SEND_BATCH_SIZE = 256
+
 KEY_TO_USE_DEFAULT = os.getenv("KEY_TO_USE_DEFAULT")
 DEFAULT_LLM_API_KEY = os.getenv("DEFAULT_LLM_API_KEY") if KEY_TO_USE_DEFAULT is not None else None
 DEFAULT_SERP_API_KEY = os.getenv("DEFAULT_SERP_API_KEY") if KEY_TO_USE_DEFAULT is not None else None
@@ -113,14 +118,47 @@ async def read_msg_worker(websocket=None, alg_msg_queue=None, proxy=None, llm_ap
     
     raise websockets.exceptions.ConnectionClosed(0, "websocket closed")
 
+def coalesce_stream_deltas(raw_messages):
+    """Merge consecutive stream deltas of the same task/role/action/step into one frame.
+
+    Returns (action, raw message) pairs so callers need not decode the frames again.
+    """
+    merged, pending, pending_key = [], None, None
+    for raw in raw_messages:
+        message = json.loads(raw)
+        if message["action"] == MessageType.StreamDelta.value:
+            data = message["data"]
+            key = (data.get("task_id"), data.get("role"), data.get("action"), data.get("step"))
+            if pending is not None and key == pending_key:
+                pending["data"]["delta"] += data["delta"]
+                continue
+            if pending is not None:
+                merged.append((MessageType.StreamDelta.value, json.dumps(pending)))
+            pending, pending_key = message, key
+            continue
+        if pending is not None:
+            merged.append((MessageType.StreamDelta.value, json.dumps(pending)))
+            pending, pending_key = None, None
+        merged.append((message["action"], raw))
+    if pending is not None:
+        merged.append((MessageType.StreamDelta.value, json.dumps(pending)))
+    return merged
+
 # send
 async def send_msg_worker(websocket=None, alg_msg_queue=None):
     while True:
         if alg_msg_queue.empty():
-            await asyncio.sleep(0.5)
-        else:
-            msg = alg_msg_queue.get_nowait()
-            print("=====Sending msg=====\n", msg)
+            await asyncio.sleep(SEND_POLL_INTERVAL)
+            continue
+        batch = []
+        try:
+            while len(batch) < SEND_BATCH_SIZE:
+                batch.append(alg_msg_queue.get_nowait())
+        except queues.Empty:
+            pass
+        for action, msg in coalesce_stream_deltas(batch):
+            if action != MessageType.StreamDelta.value:
+                print("=====Sending msg=====\n", msg)
             await websocket.send(msg)
 
 async def echo(websocket, proxy=None, llm_api_key=None, serpapi_key=None):
@@ -152,6 +190,9 @@ async def echo(websocket, proxy=None, llm_api_key=None, serpapi_key=None):
 
 async def run_service(host: str = "localhost", port: int=9000, proxy: str=None, llm_api_key:str=None, serpapi_key:str=None):
     message_handler = functools.partial(echo, proxy=proxy,llm_api_key=llm_api_key, serpapi_key=serpapi_key)
-    async with websockets.serve(message_handler, host, port):
-        logger.warning(f"Websocket server started: {host}:{port} {f'[proxy={proxy}]' if proxy else ''}")
-        await asyncio.Future()
+    try:
+        async with websockets.serve(message_handler, host, port):
+            logger.warning(f"Websocket server started: {host}:{port} {f'[proxy={proxy}]' if proxy else ''}")
+            await asyncio.Future()
+    finally:
+        await aclose_sessions()